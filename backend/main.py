@@ -1,20 +1,152 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Any, AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
 import os
+import hmac
+import uuid
+import asyncio
+import hashlib
 from dotenv import load_dotenv
 import uvicorn
 
 from services.fabric_service import FabricService
 from services.evm_service import EVMService
+from services.records import AssetRecord
+from services.shared_state import SharedState
+from services.asset_index import AssetTokenIndex
+from services.tokenization import JOB_KIND as TOKENIZE_JOB_KIND, TokenizationPipeline
+from services.job_queue import IdempotencyConflict, JobQueue, JobRunner
+from services.holder_index import TokenHolderIndex
+from services.snapshot import AssetSnapshot, SnapshotUnavailable
+from services.profiler import SamplingProfiler
+from services import serialization, tracing
+from middleware import CompressionMiddleware, TracingMiddleware, strip_encoding_suffix
 
 load_dotenv()
 
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered by services.serialization (orjson when BACKEND_FAST_JSON=true)"""
+
+    def render(self, content: Any) -> bytes:
+        return serialization.dumps(content)
+
+# Initialize services. Construction does no I/O; connections, deployments and
+# ABIs are warmed up in the lifespan handler of each worker.
+shared_state = SharedState()
+fabric_service = FabricService(state=shared_state)
+evm_service = EVMService(state=shared_state)
+asset_index = AssetTokenIndex(shared_state)
+job_queue = JobQueue(shared_state)
+tokenization = TokenizationPipeline(fabric_service, evm_service, asset_index, shared_state, job_queue)
+holder_index = TokenHolderIndex(shared_state)
+asset_snapshot = AssetSnapshot(fabric_service)
+
+# Handlers for queued ledger writes. They run in the job runner's worker threads.
+async def _create_asset_job(payload: dict, job: dict):
+    try:
+        return await fabric_service.create_asset(
+            org_id=payload["orgId"],
+            asset_id=payload["assetId"],
+            metadata=payload["metadata"]
+        )
+    except Exception as e:
+        # A timed-out earlier attempt may have committed the asset after all
+        if job["attempts"] > 1 and "already exists" in str(e):
+            return {"status": "success", "output": "Asset created by an earlier attempt"}
+        raise
+
+async def _transfer_asset_job(payload: dict, job: dict):
+    return await fabric_service.transfer_asset(
+        asset_id=payload["assetId"],
+        new_owner=payload["newOwner"]
+    )
+
+def _checkpoint_tx(job: dict):
+    return lambda tx_hash, nonce: job_queue.checkpoint(job["jobId"], {"txHash": tx_hash, "nonce": nonce})
+
+async def _mint_erc20_job(payload: dict, job: dict):
+    return await evm_service.mint_erc20(
+        to_address=payload["to"],
+        amount=payload["amount"],
+        resume_tx_hash=job["checkpoint"].get("txHash"),
+        resume_nonce=job["checkpoint"].get("nonce"),
+        on_sent=_checkpoint_tx(job)
+    )
+
+async def _mint_erc721_job(payload: dict, job: dict):
+    resume_tx_hash = job["checkpoint"].get("txHash")
+    # Once the mint was broadcast the reservation is held (or the asset linked) already
+    if resume_tx_hash is None:
+        if not _reserve_asset_mint(payload["metadataUri"], job["jobId"]):
+            raise Exception("Asset is already tokenized or being tokenized")
+        asset_id = asset_index.asset_id_from_uri(payload["metadataUri"])
+        if asset_id:
+            try:
+                await fabric_service.read_asset(asset_id)
+            except Exception as e:
+                _release_asset_mint(payload["metadataUri"], job["jobId"])
+                raise Exception(f"Asset not found on Fabric: {e}")
+    sent = []
+    checkpoint = _checkpoint_tx(job)
+
+    def on_sent(tx_hash: str, nonce: int):
+        sent.append(tx_hash)
+        checkpoint(tx_hash, nonce)
+
+    try:
+        result = await evm_service.mint_erc721(
+            to_address=payload["to"],
+            token_id=payload.get("tokenId"),
+            metadata_uri=payload["metadataUri"],
+            resume_tx_hash=resume_tx_hash,
+            resume_nonce=job["checkpoint"].get("nonce"),
+            on_sent=on_sent
+        )
+    except Exception:
+        if resume_tx_hash is None and not sent and job["attempts"] >= job["maxAttempts"]:
+            _release_asset_mint(payload["metadataUri"], job["jobId"])
+        raise
+    _index_mint(payload["metadataUri"], result)
+    return result
+
+job_runner = JobRunner(job_queue, {
+    "create_asset": _create_asset_job,
+    "transfer_asset": _transfer_asset_job,
+    "mint_erc20": _mint_erc20_job,
+    "mint_erc721": _mint_erc721_job,
+    TOKENIZE_JOB_KIND: tokenization.tokenize_asset,
+})
+
+async def _sync_asset_index():
+    try:
+        await asset_index.sync_from_evm(evm_service)
+    except Exception as e:
+        print(f"Warning: Could not sync asset index from EVM: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await evm_service.start()
+    asset_index.load()
+    # Catch up on mints made while we were down without delaying startup
+    sync_task = asyncio.create_task(_sync_asset_index())
+    if os.getenv("JOB_RUNNER_ENABLED", "true").lower() == "true":
+        job_runner.start()
+    yield
+    sync_task.cancel()
+    await job_runner.stop()
+    profiler.stop()
+    evm_service.close()
+    shared_state.close()
+
 app = FastAPI(
     title="Green Supply Chain API",
     description="API for managing supply chain assets on Hyperledger Fabric and EVM",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -26,9 +158,163 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize services
-fabric_service = FabricService()
-evm_service = EVMService()
+# Negotiated gzip/zstd compression for responses above the size threshold
+if os.getenv("BACKEND_COMPRESSION", "true").lower() == "true":
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=int(os.getenv("BACKEND_COMPRESSION_MIN_SIZE", "1024"))
+    )
+
+# Outermost, so a trace covers compression and the whole streamed body
+app.add_middleware(TracingMiddleware)
+
+profiler = SamplingProfiler()
+
+# Longest profiling window the admin endpoint accepts
+MAX_PROFILING_SECONDS = 300
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+def _ok(data: Any) -> FastJSONResponse:
+    """Wrap a service result in the standard success envelope
+
+    Returning the response directly skips FastAPI's jsonable_encoder pass;
+    service results are already JSON-ready dicts, lists and records.
+    """
+    return FastJSONResponse({"success": True, "data": data})
+
+def _enqueue(kind: str, payload: dict, idempotency_key: Optional[str]) -> FastJSONResponse:
+    """Persist a ledger write for the job runner and acknowledge it with 202"""
+    try:
+        job = job_queue.enqueue(kind, payload, idempotency_key)
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return FastJSONResponse({"success": True, "data": job}, status_code=202)
+
+def _reserve_asset_mint(metadata_uri: str, owner: str) -> bool:
+    """Reserve the asset a metadata URI names before minting its NFT; False if it is taken"""
+    asset_id = asset_index.asset_id_from_uri(metadata_uri)
+    return asset_id is None or asset_index.reserve(asset_id, owner, tokenization.reservation_ttl)
+
+def _release_asset_mint(metadata_uri: str, owner: str):
+    asset_id = asset_index.asset_id_from_uri(metadata_uri)
+    if asset_id:
+        asset_index.release(asset_id, owner)
+
+def _index_mint(metadata_uri: str, result: dict):
+    """Link a freshly minted NFT to the asset its metadata URI names"""
+    asset_id = asset_index.asset_id_from_uri(metadata_uri)
+    if asset_id and result.get("tokenId") is not None:
+        asset_index.record(asset_id, result["tokenId"], evm_service.nft_address,
+                           result["txHash"], result["blockNumber"], source="mint")
+
+def _fabric_error(e: Exception) -> HTTPException:
+    """Map a Fabric service error to the HTTP error returned to clients"""
+    error_msg = str(e)
+    # Return 503 (Service Unavailable) if Fabric network is not running
+    if "Fabric network is not running" in error_msg or "Container" in error_msg:
+        return HTTPException(status_code=503, detail=error_msg)
+    return HTTPException(status_code=500, detail=error_msg)
+
+async def _stream_list(request: Request, items: AsyncIterator[Any]) -> StreamingResponse:
+    """Stream a list result without materializing it
+
+    Clients sending `Accept: application/x-ndjson` get one JSON document per
+    line; everyone else gets the usual {"success": true, "data": [...]}
+    envelope written incrementally. The first element is pulled before the
+    response starts so upstream failures still map to an HTTP error status.
+    """
+    iterator = items.__aiter__()
+    pending = []
+    try:
+        pending.append(await iterator.__anext__())
+    except StopAsyncIteration:
+        pass
+    ndjson = NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+    dumps = serialization.dumps
+
+    async def body():
+        if not ndjson:
+            yield b'{"success":true,"data":['
+        first = True
+        try:
+            for item in pending:
+                yield dumps(item) + b"\n" if ndjson else dumps(item)
+                first = False
+            async for item in iterator:
+                if ndjson:
+                    yield dumps(item) + b"\n"
+                else:
+                    yield dumps(item) if first else b"," + dumps(item)
+                first = False
+        finally:
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+        if not ndjson:
+            yield b"]}"
+
+    media_type = NDJSON_MEDIA_TYPE if ndjson else "application/json"
+    return StreamingResponse(body(), media_type=media_type)
+
+def _ledger_etag(request: Request, height: int) -> str:
+    """Strong ETag for a read at a given ledger height
+
+    The same URL and Accept header at the same height always produce the
+    same body, so the height plus a digest of those identifies it.
+    """
+    key = f"{request.url.path}?{request.url.query}|{request.headers.get('accept', '')}"
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    return f'"{height}-{digest}"'
+
+def _matching_etag(request: Request, etag: str) -> Optional[str]:
+    """Return the If-None-Match tag that matches `etag`, if any
+
+    The client's own tag is echoed on the 304 so it keeps any coding suffix
+    the compression middleware added to the original response.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == "*":
+        return etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        # If-None-Match uses weak comparison, so W/"x" matches "x"
+        opaque = tag[2:] if tag.startswith("W/") else tag
+        if strip_encoding_suffix(opaque) == etag:
+            return tag
+    return None
+
+async def _conditional_get(
+    request: Request,
+    get_height: Callable[[], Awaitable[int]],
+    build: Callable[[], Awaitable[Response]]
+) -> Response:
+    """Serve a ledger read with ETag/If-None-Match support
+
+    A matching If-None-Match is answered with 304 before any data is
+    fetched. If the height cannot be read, the response is built without an
+    ETag and the data call reports the error as usual.
+    """
+    try:
+        etag = _ledger_etag(request, await get_height())
+    except Exception:
+        etag = None
+    matched = _matching_etag(request, etag) if etag else None
+    if matched:
+        return Response(status_code=304, headers={"ETag": matched})
+    response = await build()
+    if etag:
+        response.headers["ETag"] = etag
+    return response
+
+async def _iter_fabric_transactions() -> AsyncIterator[Any]:
+    """Yield the history entries of every asset, one asset at a time"""
+    async for asset in fabric_service.iter_all_assets():
+        if isinstance(asset, AssetRecord):
+            async for entry in fabric_service.iter_asset_history(asset.assetId):
+                yield entry
 
 # Request models
 class CreateAssetRequest(BaseModel):
@@ -49,6 +335,23 @@ class TransferAssetRequest(BaseModel):
     assetId: str
     newOwner: str
 
+class ERC20BalancesRequest(BaseModel):
+    addresses: List[str]
+
+class TokenizeBatchRequest(BaseModel):
+    assetIds: List[str]
+    to: str
+    metadataUriTemplate: Optional[str] = None
+
+class TracingSettingsRequest(BaseModel):
+    enabled: Optional[bool] = None
+    sampleRate: Optional[float] = None
+    slowMs: Optional[float] = None
+
+class ProfilingRequest(BaseModel):
+    seconds: float = 10
+    intervalMs: float = 5
+
 @app.get("/")
 async def root():
     return {"message": "Green Supply Chain API", "version": "1.0.0"}
@@ -62,91 +365,141 @@ async def get_network_health():
     """Check Fabric network health and node connectivity"""
     try:
         result = await fabric_service.check_network_health()
-        return {"success": True, "data": result}
+        return _ok(result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/network/peers")
+async def get_peer_routing():
+    """Peers queries and endorsements are routed to, with their health and latency"""
+    return _ok({
+        "endorsementCount": fabric_service.router.endorsement_count,
+        "peers": fabric_service.router.status()
+    })
+
 @app.get("/api/network/node/{org_name}")
 async def get_node_info(org_name: str):
     """Get detailed information about a specific node"""
     try:
         result = await fabric_service.get_node_info(org_name)
-        return {"success": True, "data": result}
+        return _ok(result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 # Asset endpoints (Fabric)
 @app.post("/api/assets/create")
-async def create_asset(request: CreateAssetRequest):
-    """Create a new asset on Fabric ledger"""
+async def create_asset(
+    request: CreateAssetRequest,
+    queued: bool = False,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Create a new asset on Fabric ledger (queued=true acknowledges immediately)"""
+    if queued:
+        return _enqueue("create_asset", request.model_dump(), idempotency_key)
     try:
         result = await fabric_service.create_asset(
             org_id=request.orgId,
             asset_id=request.assetId,
             metadata=request.metadata
         )
-        return {"success": True, "data": result}
+        return _ok(result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/assets/{asset_id}")
-async def get_asset(asset_id: str):
+async def get_asset(request: Request, asset_id: str):
     """Get asset details from Fabric ledger"""
+    async def build():
+        return _ok(await fabric_service.read_asset(asset_id))
+
     try:
-        result = await fabric_service.read_asset(asset_id)
-        return {"success": True, "data": result}
+        return await _conditional_get(request, fabric_service.get_ledger_height, build)
     except Exception as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 @app.post("/api/assets/{asset_id}/transfer")
-async def transfer_asset(asset_id: str, request: TransferAssetRequest):
-    """Transfer asset ownership on Fabric ledger"""
+async def transfer_asset(
+    asset_id: str,
+    request: TransferAssetRequest,
+    queued: bool = False,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Transfer asset ownership on Fabric ledger (queued=true acknowledges immediately)"""
+    if queued:
+        return _enqueue("transfer_asset", request.model_dump(), idempotency_key)
     try:
         result = await fabric_service.transfer_asset(
             asset_id=request.assetId,
             new_owner=request.newOwner
         )
-        return {"success": True, "data": result}
+        return _ok(result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/assets")
-async def get_all_assets():
-    """Get all assets from Fabric ledger"""
+async def get_all_assets(request: Request):
+    """Stream all assets from Fabric ledger"""
     try:
-        result = await fabric_service.get_all_assets()
-        return {"success": True, "data": result}
+        return await _conditional_get(
+            request,
+            fabric_service.get_ledger_height,
+            lambda: _stream_list(request, fabric_service.iter_all_assets())
+        )
     except Exception as e:
-        error_msg = str(e)
-        # Return 503 (Service Unavailable) if Fabric network is not running
-        if "Fabric network is not running" in error_msg or "Container" in error_msg:
-            raise HTTPException(status_code=503, detail=error_msg)
-        raise HTTPException(status_code=500, detail=error_msg)
+        raise _fabric_error(e)
 
 # Token endpoints (EVM)
 @app.post("/api/tokens/erc20/mint")
-async def mint_erc20(request: MintERC20Request):
-    """Mint ERC20 tokens on EVM"""
+async def mint_erc20(
+    request: MintERC20Request,
+    queued: bool = False,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Mint ERC20 tokens on EVM (queued=true acknowledges immediately)"""
+    if queued:
+        return _enqueue("mint_erc20", request.model_dump(), idempotency_key)
     try:
         result = await evm_service.mint_erc20(
             to_address=request.to,
             amount=request.amount
         )
-        return {"success": True, "data": result}
+        return _ok(result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/tokens/erc721/mint")
-async def mint_erc721(request: MintERC721Request):
-    """Mint ERC721 NFT on EVM"""
+async def mint_erc721(
+    request: MintERC721Request,
+    queued: bool = False,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Mint ERC721 NFT on EVM (queued=true acknowledges immediately)"""
+    if queued:
+        return _enqueue("mint_erc721", request.model_dump(), idempotency_key)
+    owner = uuid.uuid4().hex
+    if not _reserve_asset_mint(request.metadataUri, owner):
+        raise HTTPException(status_code=409, detail="Asset is already tokenized or being tokenized")
+    asset_id = asset_index.asset_id_from_uri(request.metadataUri)
+    if asset_id:
+        try:
+            await fabric_service.read_asset(asset_id)
+        except Exception as e:
+            _release_asset_mint(request.metadataUri, owner)
+            raise HTTPException(status_code=404, detail=f"Asset not found on Fabric: {e}")
+    sent = []
     try:
         result = await evm_service.mint_erc721(
             to_address=request.to,
             token_id=request.tokenId,
-            metadata_uri=request.metadataUri
+            metadata_uri=request.metadataUri,
+            on_sent=lambda tx_hash, nonce: sent.append(tx_hash)
         )
-        return {"success": True, "data": result}
+        _index_mint(request.metadataUri, result)
+        return _ok(result)
     except Exception as e:
+        # A broadcast mint may still be mined, so only a mint never sent frees the asset
+        if not sent:
+            _release_asset_mint(request.metadataUri, owner)
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/tokens/erc20/balance/{address}")
@@ -154,75 +507,271 @@ async def get_erc20_balance(address: str):
     """Get ERC20 token balance for an address"""
     try:
         result = await evm_service.get_erc20_balance(address)
-        return {"success": True, "data": {"balance": result}}
+        return _ok({"balance": result})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/tokens/erc20/balances")
+async def get_erc20_balances(request: ERC20BalancesRequest):
+    """Get ERC20 balances for many addresses at one consistent block height"""
+    try:
+        result = await evm_service.get_erc20_balances(request.addresses)
+        return _ok(result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/tokens/erc20/holders")
+async def get_erc20_holders(limit: Optional[int] = None):
+    """Get ERC20 holders, largest balance first, from the Transfer-event holder table"""
+    try:
+        await holder_index.sync(evm_service)
+    except Exception as e:
+        # Serve the last synced snapshot if the node is unreachable
+        print(f"Warning: Could not sync ERC20 holders: {e}")
+    contract = evm_service.token_address
+    return _ok({
+        "contract": contract,
+        "blockNumber": holder_index.synced_block(contract),
+        "holderCount": holder_index.holder_count(contract),
+        "holders": holder_index.holders(contract, limit)
+    })
+
+@app.get("/api/tokens/erc721/{token_id}/asset")
+async def get_token_asset(token_id: int):
+    """Get the Fabric asset an NFT represents"""
+    mapping = asset_index.by_token(token_id)
+    if mapping is None:
+        raise HTTPException(status_code=404, detail=f"Token {token_id} is not linked to an asset")
+    return _ok(mapping)
+
+# Cross-ledger index and tokenization endpoints
+@app.get("/api/assets/{asset_id}/token")
+async def get_asset_token(asset_id: str):
+    """Get the NFT that represents a Fabric asset"""
+    mapping = asset_index.by_asset(asset_id)
+    if mapping is None:
+        raise HTTPException(status_code=404, detail=f"Asset {asset_id} is not tokenized")
+    return _ok(mapping)
+
+@app.post("/api/index/sync")
+async def sync_asset_index():
+    """Refresh the asset/NFT index from NFTMinted events and Fabric asset metadata"""
+    result = {"evm": 0, "fabric": 0, "errors": []}
+    try:
+        result["evm"] = await asset_index.sync_from_evm(evm_service)
+    except Exception as e:
+        result["errors"].append(f"EVM: {e}")
+    try:
+        result["fabric"] = await asset_index.sync_from_fabric(fabric_service)
+    except Exception as e:
+        result["errors"].append(f"Fabric: {e}")
+    return _ok(result)
+
+@app.post("/api/tokenize/batch")
+async def tokenize_batch(request: TokenizeBatchRequest):
+    """Tokenize many Fabric assets as NFTs, one queued job per asset"""
+    if not request.assetIds:
+        raise HTTPException(status_code=400, detail="assetIds must not be empty")
+    try:
+        job = tokenization.submit(request.assetIds, request.to, request.metadataUriTemplate)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse({"success": True, "data": job}, status_code=202)
+
+@app.get("/api/tokenize/jobs/{job_id}")
+async def get_tokenize_job(job_id: str):
+    """Get the progress of a tokenization job"""
+    job = tokenization.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return _ok(job)
+
+# Write queue endpoints
+@app.get("/api/jobs")
+async def list_jobs(status: Optional[str] = None, limit: int = 50):
+    """List recent queued ledger writes with per-status counts"""
+    return _ok({"jobs": job_queue.list(status, limit), "stats": job_queue.stats()})
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Get the status of a queued ledger write"""
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return _ok(job)
+
 # Ledger endpoints
 @app.get("/api/ledger/txs")
-async def get_transactions(assetId: Optional[str] = None):
-    """Get transaction history for an asset or all transactions"""
+async def get_transactions(request: Request, assetId: Optional[str] = None):
+    """Stream transaction history for an asset or all transactions"""
     try:
         if assetId:
-            result = await fabric_service.get_asset_history(assetId)
+            items = fabric_service.iter_asset_history(assetId)
         else:
-            result = await fabric_service.get_all_assets()
-        return {"success": True, "data": result}
+            items = fabric_service.iter_all_assets()
+        return await _conditional_get(
+            request,
+            fabric_service.get_ledger_height,
+            lambda: _stream_list(request, items)
+        )
     except Exception as e:
-        error_msg = str(e)
-        # Return 503 (Service Unavailable) if Fabric network is not running
-        if "Fabric network is not running" in error_msg or "Container" in error_msg:
-            raise HTTPException(status_code=503, detail=error_msg)
-        raise HTTPException(status_code=500, detail=error_msg)
+        raise _fabric_error(e)
 
 # Blockchain data endpoints
 @app.get("/api/blockchain/evm/transactions")
-async def get_evm_transactions(limit: int = 50):
+async def get_evm_transactions(request: Request, limit: int = 50):
     """Get recent EVM blockchain transactions"""
     try:
-        result = await evm_service.get_evm_transactions(limit)
-        return {"success": True, "data": result}
+        async def build():
+            return _ok(await evm_service.get_evm_transactions(limit))
+
+        return await _conditional_get(request, evm_service.get_block_number, build)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/blockchain/evm/events")
-async def get_smart_contract_events(limit: int = 50):
+async def get_smart_contract_events(request: Request, limit: int = 50):
     """Get smart contract events (mints, transfers)"""
     try:
-        result = await evm_service.get_smart_contract_events(limit)
-        return {"success": True, "data": result}
+        async def build():
+            return _ok(await evm_service.get_smart_contract_events(limit))
+
+        return await _conditional_get(request, evm_service.get_block_number, build)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/blockchain/tokenized-assets")
-async def get_tokenized_assets():
-    """Get all tokenized assets (NFTs representing supply chain assets)"""
+async def get_tokenized_assets(request: Request):
+    """Stream all tokenized assets (NFTs representing supply chain assets)"""
     try:
-        result = await evm_service.get_tokenized_assets()
-        return {"success": True, "data": result}
+        return await _conditional_get(
+            request,
+            evm_service.get_block_number,
+            lambda: _stream_list(request, evm_service.iter_tokenized_assets())
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/blockchain/fabric/transactions")
-async def get_fabric_transactions():
-    """Get all Fabric blockchain transactions"""
-    try:
-        assets = await fabric_service.get_all_assets()
-        transactions = []
-        for asset in assets:
-            if isinstance(asset, dict):
-                history = await fabric_service.get_asset_history(asset.get("assetId", ""))
-                if isinstance(history, list):
-                    transactions.extend(history)
-        return {"success": True, "data": transactions}
+async def get_fabric_transactions(request: Request):
+    """Stream all Fabric blockchain transactions"""
+    try:
+        return await _conditional_get(
+            request,
+            fabric_service.get_ledger_height,
+            lambda: _stream_list(request, _iter_fabric_transactions())
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Analytics endpoints (columnar snapshot of Fabric assets)
+@app.post("/api/analytics/snapshot/refresh")
+async def refresh_snapshot(force: bool = False):
+    """Bring the Parquet asset snapshot up to the current ledger height"""
+    try:
+        return _ok(await asset_snapshot.refresh(force=force))
+    except SnapshotUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise _fabric_error(e)
+
+@app.get("/api/analytics/snapshot")
+async def get_snapshot_info():
+    """Get the ledger height and size of the current asset snapshot"""
+    try:
+        return _ok(asset_snapshot.info())
+    except SnapshotUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+@app.get("/api/analytics/footprint")
+async def get_footprint(groupBy: str = "origin"):
+    """Aggregate carbon footprint over the asset snapshot, grouped by a metadata column"""
+    try:
+        return _ok(asset_snapshot.footprint_by(groupBy))
+    except SnapshotUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def _require_admin(token: Optional[str]):
+    """Reject admin calls without the configured ADMIN_TOKEN; the admin API is off when it is unset"""
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin API is disabled; set ADMIN_TOKEN to enable it")
+    if token is None or not hmac.compare_digest(token.encode(), expected.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+def _tracing_settings() -> dict:
+    return {
+        "enabled": tracing.config.enabled,
+        "sampleRate": tracing.config.sample_rate,
+        "slowMs": tracing.config.slow_ms,
+        "pid": os.getpid(),
+    }
+
+# Tracing settings, slow traces and the profiler are per worker process;
+# with BACKEND_WORKERS > 1 each call reaches whichever worker accepts it.
+
+@app.get("/api/admin/tracing")
+async def get_tracing_settings(x_admin_token: Optional[str] = Header(None)):
+    """Current request tracing settings"""
+    _require_admin(x_admin_token)
+    return _ok(_tracing_settings())
+
+@app.post("/api/admin/tracing")
+async def update_tracing_settings(request: TracingSettingsRequest,
+                                  x_admin_token: Optional[str] = Header(None)):
+    """Switch request tracing on or off and adjust sampling and the slow threshold"""
+    _require_admin(x_admin_token)
+    if request.sampleRate is not None and not 0 <= request.sampleRate <= 1:
+        raise HTTPException(status_code=400, detail="sampleRate must be between 0 and 1")
+    if request.enabled is not None:
+        tracing.config.enabled = request.enabled
+    if request.sampleRate is not None:
+        tracing.config.sample_rate = request.sampleRate
+    if request.slowMs is not None:
+        tracing.config.slow_ms = request.slowMs
+    return _ok(_tracing_settings())
+
+@app.get("/api/admin/traces/slow")
+async def get_slow_traces(limit: int = 20, x_admin_token: Optional[str] = Header(None)):
+    """Span trees of the most recent requests slower than TRACE_SLOW_MS"""
+    _require_admin(x_admin_token)
+    return _ok(tracing.slow_traces(limit))
+
+@app.post("/api/admin/profiling")
+async def start_profiling(request: ProfilingRequest, x_admin_token: Optional[str] = Header(None)):
+    """Sample all thread stacks for a time window; read the result from GET /api/admin/profiling"""
+    _require_admin(x_admin_token)
+    if not 0 < request.seconds <= MAX_PROFILING_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {MAX_PROFILING_SECONDS}")
+    try:
+        return _ok(profiler.start(request.seconds, request.intervalMs))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+@app.get("/api/admin/profiling")
+async def get_profiling(top: int = 50, x_admin_token: Optional[str] = Header(None)):
+    """Collapsed stacks from the current or last profiling window, most sampled first"""
+    _require_admin(x_admin_token)
+    return _ok(profiler.status(top))
+
+def _worker_count() -> int:
+    """Number of worker processes from BACKEND_WORKERS ("auto" = one per CPU)"""
+    workers = os.getenv("BACKEND_WORKERS", "1")
+    if workers == "auto":
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
 if __name__ == "__main__":
+    workers = _worker_count()
+    # Auto-reload only makes sense for a single development worker
+    reload = os.getenv("BACKEND_DEBUG", "true").lower() == "true" and workers == 1
     uvicorn.run(
         "main:app",
         host=os.getenv("BACKEND_HOST", "0.0.0.0"),
         port=int(os.getenv("BACKEND_PORT", 8000)),
-        reload=os.getenv("BACKEND_DEBUG", "true").lower() == "true"
+        reload=reload,
+        workers=None if reload else workers
     )
 
@@ -0,0 +1,197 @@
+import zlib
+from typing import List, Optional, Tuple
+
+from services import tracing
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip is always available
+    zstandard = None
+
+# Content types whose bodies are worth compressing
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the best supported content coding from an Accept-Encoding header"""
+    offered = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        offered[token] = quality
+
+    wildcard = offered.get("*", 0.0)
+    candidates = ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+    best, best_quality = None, 0.0
+    for encoding in candidates:
+        quality = offered.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+class _Compressor:
+    """Streaming compressor for one response body"""
+
+    def __init__(self, encoding: str, gzip_level: int, zstd_level: int):
+        if encoding == "zstd":
+            self._obj = zstandard.ZstdCompressor(level=zstd_level).compressobj()
+            self._flush_mode = zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        else:
+            # wbits=31 produces a gzip container
+            self._obj = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+            self._flush_mode = zlib.Z_SYNC_FLUSH
+
+    def chunk(self, data: bytes) -> bytes:
+        """Compress a body chunk and flush it so streamed records reach the client"""
+        return self._obj.compress(data) + self._obj.flush(self._flush_mode)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._obj.compress(data) + self._obj.flush()
+
+
+class CompressionMiddleware:
+    """Negotiated gzip/zstd response compression
+
+    Bodies smaller than `minimum_size` are sent as-is. Streaming responses
+    are compressed chunk by chunk. A strong ETag on a compressed response
+    gets the coding appended (`"abc"` -> `"abc-gzip"`) because the encoded
+    bytes are a different representation.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, zstd_level: int = 3):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.zstd_level = zstd_level
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                headers = start_message.get("headers", [])
+                if not self._should_compress(start_message["status"], headers, body, more_body):
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding, self.gzip_level, self.zstd_level)
+                if more_body:
+                    body = compressor.chunk(body)
+                else:
+                    body = compressor.finish(body)
+                start_message["headers"] = self._encoded_headers(headers, encoding, None if more_body else len(body))
+                await send(start_message)
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+
+            body = compressor.chunk(body) if more_body else compressor.finish(body)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _should_compress(self, status: int, headers: List[Tuple[bytes, bytes]], body: bytes, more_body: bool) -> bool:
+        if status < 200 or status in (204, 304):
+            return False
+        content_type = b""
+        for name, value in headers:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        if not content_type.decode("latin-1").startswith(COMPRESSIBLE_TYPES):
+            return False
+        return more_body or len(body) >= self.minimum_size
+
+    @staticmethod
+    def _encoded_headers(headers: List[Tuple[bytes, bytes]], encoding: str,
+                         length: Optional[int]) -> List[Tuple[bytes, bytes]]:
+        result = []
+        vary = None
+        for name, value in headers:
+            if name == b"content-length":
+                continue
+            if name == b"etag" and value.startswith(b'"'):
+                value = value[:-1] + b"-" + encoding.encode() + b'"'
+            if name == b"vary":
+                vary = value
+                continue
+            result.append((name, value))
+        result.append((b"content-encoding", encoding.encode()))
+        result.append((b"vary", vary + b", Accept-Encoding" if vary else b"Accept-Encoding"))
+        if length is not None:
+            result.append((b"content-length", str(length).encode()))
+        return result
+
+
+class TracingMiddleware:
+    """Opens the root span for each HTTP request when tracing is enabled
+
+    The span closes after the last body chunk is sent, so time spent
+    producing a streamed response is part of the trace.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with tracing.trace_request(f"{scope['method']} {scope['path']}") as root:
+            if root is None:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    root.attributes["status"] = message["status"]
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+
+def strip_encoding_suffix(etag: str) -> str:
+    """Undo the coding suffix CompressionMiddleware adds to ETags"""
+    for suffix in ('-gzip"', '-zstd"'):
+        if etag.endswith(suffix):
+            return etag[:-len(suffix)] + '"'
+    return etag
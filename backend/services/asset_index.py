@@ -0,0 +1,182 @@
+import os
+import re
+import time
+from typing import Any, Dict, Optional
+
+from services import serialization
+from services.records import AssetRecord
+from services.shared_state import SharedState
+
+# How an NFT's tokenURI names the Fabric asset it represents: the whole URI
+# is "asset://ASSET001", or it has an "assetId=ASSET001" query parameter.
+# Plain paths are not matched; "/assets/logo.png" is not an asset.
+DEFAULT_ASSET_URI_PATTERN = r"(?:^asset://|[?&]assetId=)(?P<assetId>[A-Za-z0-9_.-]+)(?=$|[&#])"
+
+# Columns returned for each mapping, in table order
+_COLUMNS = ("assetId", "tokenId", "contract", "txHash", "blockNumber", "source")
+
+
+class AssetTokenIndex:
+    """Bidirectional index between Fabric asset IDs and ERC721 token IDs
+
+    Both directions are served from in-process dicts. Mappings are written
+    through to a table in the shared SQLite store, so a lookup that misses
+    locally falls back to what other workers have recorded. Before minting,
+    a writer reserves the asset in the same store, so two requests in any
+    worker cannot both mint a token for it.
+    """
+
+    def __init__(self, state: SharedState, asset_uri_pattern: Optional[str] = None):
+        self.state = state
+        self.asset_uri_pattern = re.compile(
+            asset_uri_pattern or os.getenv("ASSET_URI_PATTERN", DEFAULT_ASSET_URI_PATTERN)
+        )
+        self._by_asset: Dict[str, Dict[str, Any]] = {}
+        self._by_token: Dict[int, Dict[str, Any]] = {}
+        self._table_ready = False
+
+    def _ensure_table(self, conn):
+        if not self._table_ready:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS asset_tokens ("
+                "asset_id TEXT PRIMARY KEY, token_id INTEGER NOT NULL UNIQUE, "
+                "contract TEXT, tx_hash TEXT, block_number INTEGER, source TEXT)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS asset_reservations ("
+                "asset_id TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._table_ready = True
+
+    def _remember(self, mapping: Dict[str, Any]) -> Dict[str, Any]:
+        self._by_asset[mapping["assetId"]] = mapping
+        self._by_token[mapping["tokenId"]] = mapping
+        return mapping
+
+    def load(self) -> int:
+        """Load every persisted mapping into memory; returns the mapping count"""
+        with self.state.connection() as conn:
+            self._ensure_table(conn)
+            rows = conn.execute(
+                "SELECT asset_id, token_id, contract, tx_hash, block_number, source FROM asset_tokens"
+            ).fetchall()
+        for row in rows:
+            self._remember(dict(zip(_COLUMNS, row)))
+        return len(rows)
+
+    def asset_id_from_uri(self, token_uri: Optional[str]) -> Optional[str]:
+        """Extract the Fabric asset ID a tokenURI refers to, if any"""
+        if not token_uri:
+            return None
+        match = self.asset_uri_pattern.search(token_uri)
+        return match.group("assetId") if match else None
+
+    def record(self, asset_id: str, token_id: int, contract: Optional[str] = None,
+               tx_hash: Optional[str] = None, block_number: Optional[int] = None,
+               source: str = "api") -> Dict[str, Any]:
+        """Link an asset to a token; the first link recorded for either side wins"""
+        token_id = int(token_id)
+        with self.state.connection() as conn:
+            self._ensure_table(conn)
+            conn.execute(
+                "INSERT OR IGNORE INTO asset_tokens "
+                "(asset_id, token_id, contract, tx_hash, block_number, source) VALUES (?, ?, ?, ?, ?, ?)",
+                (asset_id, token_id, contract, tx_hash, block_number, source)
+            )
+            row = conn.execute(
+                "SELECT asset_id, token_id, contract, tx_hash, block_number, source "
+                "FROM asset_tokens WHERE asset_id = ?", (asset_id,)
+            ).fetchone()
+            # The asset is linked now, so a pending reservation has served its purpose
+            conn.execute("DELETE FROM asset_reservations WHERE asset_id = ?", (asset_id,))
+        if row is None:
+            # The token is already linked to a different asset
+            return self.by_token(token_id)
+        return self._remember(dict(zip(_COLUMNS, row)))
+
+    def reserve(self, asset_id: str, owner: str, ttl: float) -> bool:
+        """Claim the right to mint a token for an asset
+
+        False if the asset is already linked or reserved by another owner.
+        The same owner may reserve again, e.g. when a job is retried, which
+        extends the reservation. Reservations expire after `ttl` seconds so
+        a writer that died does not block the asset forever.
+        """
+        now = time.time()
+        with self.state.connection() as conn:
+            self._ensure_table(conn)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if conn.execute("SELECT 1 FROM asset_tokens WHERE asset_id = ?", (asset_id,)).fetchone():
+                    reserved = False
+                else:
+                    conn.execute(
+                        "DELETE FROM asset_reservations WHERE asset_id = ? AND (owner = ? OR expires_at <= ?)",
+                        (asset_id, owner, now)
+                    )
+                    cursor = conn.execute(
+                        "INSERT OR IGNORE INTO asset_reservations (asset_id, owner, expires_at) VALUES (?, ?, ?)",
+                        (asset_id, owner, now + ttl)
+                    )
+                    reserved = cursor.rowcount == 1
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return reserved
+
+    def release(self, asset_id: str, owner: str) -> None:
+        """Give up a reservation that did not lead to a mint"""
+        with self.state.connection() as conn:
+            self._ensure_table(conn)
+            conn.execute("DELETE FROM asset_reservations WHERE asset_id = ? AND owner = ?", (asset_id, owner))
+
+    def _load_one(self, column: str, value: Any) -> Optional[Dict[str, Any]]:
+        with self.state.connection() as conn:
+            self._ensure_table(conn)
+            row = conn.execute(
+                "SELECT asset_id, token_id, contract, tx_hash, block_number, source "
+                f"FROM asset_tokens WHERE {column} = ?", (value,)
+            ).fetchone()
+        return self._remember(dict(zip(_COLUMNS, row))) if row else None
+
+    def by_asset(self, asset_id: str) -> Optional[Dict[str, Any]]:
+        """Token mapped to a Fabric asset"""
+        return self._by_asset.get(asset_id) or self._load_one("asset_id", asset_id)
+
+    def by_token(self, token_id: int) -> Optional[Dict[str, Any]]:
+        """Fabric asset mapped to an ERC721 token"""
+        token_id = int(token_id)
+        return self._by_token.get(token_id) or self._load_one("token_id", token_id)
+
+    async def sync_from_evm(self, evm_service) -> int:
+        """Index NFTMinted events emitted since the last sync; returns new mappings"""
+        latest = await evm_service.get_block_number()
+        from_block = self.state.get("asset_index:evm:next_block") or 0
+        if from_block > latest:
+            return 0
+        added = 0
+        for mint in await evm_service.get_nft_mints(from_block, latest):
+            asset_id = self.asset_id_from_uri(mint["tokenURI"])
+            if asset_id and self.by_asset(asset_id) is None:
+                self.record(asset_id, mint["tokenId"], mint["contract"], mint["txHash"],
+                            mint["blockNumber"], source="NFTMinted")
+                added += 1
+        self.state.set("asset_index:evm:next_block", latest + 1)
+        return added
+
+    async def sync_from_fabric(self, fabric_service) -> int:
+        """Index assets whose metadata already names their token (a "tokenId" field)"""
+        added = 0
+        async for asset in fabric_service.iter_all_assets():
+            if not isinstance(asset, AssetRecord) or not asset.metadata or asset.assetId in self._by_asset:
+                continue
+            try:
+                metadata = serialization.loads(asset.metadata)
+            except ValueError:
+                continue
+            token_id = metadata.get("tokenId") if isinstance(metadata, dict) else None
+            if token_id is not None and str(token_id).isdigit() and self.by_asset(asset.assetId) is None:
+                self.record(asset.assetId, int(token_id), source="fabric")
+                added += 1
+        return added
@@ -1,9 +1,14 @@
 import os
 import json
+import requests
 from web3 import Web3
-from typing import Dict, Any, Optional, List
+from web3.exceptions import MismatchedABI, TransactionNotFound
+from typing import Dict, Any, Optional, List, AsyncIterator, Callable
 from dotenv import load_dotenv
 
+from services import tracing
+from services.shared_state import SharedState
+
 # Load .env file, but don't fail if it doesn't exist or has encoding issues
 try:
     load_dotenv()
@@ -14,19 +19,79 @@ except Exception as e:
 class EVMService:
     """Service for interacting with EVM-compatible blockchain"""
     
-    def __init__(self):
+    def __init__(self, state: Optional[SharedState] = None):
         self.rpc_url = os.getenv("EVM_RPC_URL", "http://localhost:8545")
         self.chain_id = int(os.getenv("EVM_CHAIN_ID", "1337"))
         self.private_key = os.getenv("EVM_PRIVATE_KEY", "")
-        self.w3 = Web3(Web3.HTTPProvider(self.rpc_url))
+        self.rpc_pool_size = int(os.getenv("EVM_RPC_POOL_SIZE", "20"))
+        # Cross-worker cache and nonce store; process-local unless one is passed in
+        self.state = state or SharedState(":memory:")
+        # Block number is cached briefly so conditional GETs rarely touch the node
+        self.block_number_ttl = float(os.getenv("LEDGER_HEIGHT_CACHE_TTL", "2"))
         
-        # Load contract addresses from deployments
-        self.token_address = None
-        self.nft_address = None
+        # Provider, deployments and ABIs are loaded on first use or by start(),
+        # so constructing the service does no I/O
+        self._w3: Optional[Web3] = None
+        self._session: Optional[requests.Session] = None
+        self._token_address: Optional[str] = None
+        self._nft_address: Optional[str] = None
+        self._deployments_loaded = False
+        self._abi_cache: Dict[str, list] = {}
+        self._contract_cache: Dict[tuple, Any] = {}
+    
+    def _http_session(self) -> requests.Session:
+        """Pooled HTTP session shared by web3 and raw JSON-RPC batches"""
+        if self._session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.rpc_pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            self._session = session
+        return self._session
+    
+    @property
+    def w3(self) -> Web3:
+        """Web3 client backed by a pooled HTTP session"""
+        if self._w3 is None:
+            self._w3 = Web3(Web3.HTTPProvider(self.rpc_url, session=self._http_session()))
+            # Every JSON-RPC call becomes a span in traced requests
+            self._w3.middleware_onion.add(tracing.web3_middleware, "tracing")
+        return self._w3
+    
+    @property
+    def token_address(self) -> Optional[str]:
+        if not self._deployments_loaded:
+            self._load_deployments()
+        return self._token_address
+    
+    @property
+    def nft_address(self) -> Optional[str]:
+        if not self._deployments_loaded:
+            self._load_deployments()
+        return self._nft_address
+    
+    async def start(self):
+        """Pre-warm deployments, ABIs, contract objects and the RPC connection pool"""
         self._load_deployments()
+        for address, contract_type in (
+            (self._token_address, "erc20/GreenSupplyToken.sol"),
+            (self._nft_address, "erc721/GreenSupplyNFT.sol"),
+        ):
+            if address and self._get_contract_abi(contract_type):
+                self._get_contract(address, contract_type)
+        try:
+            self.w3.eth.chain_id
+        except Exception as e:
+            print(f"Warning: EVM node not reachable at startup: {e}")
+    
+    def close(self):
+        """Release the RPC connection pool"""
+        if self._session is not None:
+            self._session.close()
     
     def _load_deployments(self):
         """Load contract addresses from deployments.json"""
+        self._deployments_loaded = True
         try:
             deployments_path = os.path.join(
                 os.path.dirname(__file__),
@@ -38,8 +103,8 @@ class EVMService:
             if os.path.exists(deployments_path):
                 with open(deployments_path, "r") as f:
                     deployments = json.load(f)
-                    self.token_address = deployments.get("token")
-                    self.nft_address = deployments.get("nft")
+                    self._token_address = deployments.get("token")
+                    self._nft_address = deployments.get("nft")
         except Exception as e:
             print(f"Warning: Could not load deployments: {e}")
     
@@ -50,7 +115,9 @@ class EVMService:
         return self.w3.eth.account.from_key(self.private_key)
     
     def _get_contract_abi(self, contract_type: str) -> list:
-        """Load contract ABI from artifacts"""
+        """Load contract ABI from artifacts, reading each artifact file once"""
+        if contract_type in self._abi_cache:
+            return self._abi_cache[contract_type]
         try:
             artifacts_path = os.path.join(
                 os.path.dirname(__file__),
@@ -68,12 +135,98 @@ class EVMService:
             if files:
                 with open(files[0], "r") as f:
                     artifact = json.load(f)
-                    return artifact.get("abi", [])
+                    self._abi_cache[contract_type] = artifact.get("abi", [])
+                    return self._abi_cache[contract_type]
         except Exception as e:
             print(f"Warning: Could not load ABI: {e}")
         return []
     
-    async def mint_erc20(self, to_address: str, amount: str) -> Dict[str, Any]:
+    def _get_contract(self, address: str, contract_type: str):
+        """Get a cached contract object for a deployed address"""
+        key = (address, contract_type)
+        if key not in self._contract_cache:
+            self._contract_cache[key] = self.w3.eth.contract(
+                address=address, abi=self._get_contract_abi(contract_type)
+            )
+        return self._contract_cache[key]
+    
+    def _next_nonce(self, address: str) -> int:
+        """Reserve a nonce shared across workers so concurrent sends don't collide"""
+        chain_nonce = self.w3.eth.get_transaction_count(address, "pending")
+        return self.state.next_nonce(address, chain_nonce)
+    
+    def _send_transaction(self, account, function_call, gas: int,
+                          resume_tx_hash: Optional[str] = None,
+                          resume_nonce: Optional[int] = None,
+                          on_sent: Optional[Callable[[str, int], None]] = None):
+        """Build, sign and broadcast a contract call with a shared nonce
+
+        The nonce is given back if the transaction never left this process.
+        `on_sent` receives the hash and nonce as soon as it is broadcast.
+        Passing those back as `resume_tx_hash`/`resume_nonce` waits for the
+        earlier transaction instead of sending a new one, so a retry cannot
+        mint twice. If the node no longer knows the earlier transaction (it
+        was dropped from the pool), it is signed and sent again with the same
+        nonce, so at most one of the two can ever be mined.
+        """
+        nonce = None
+        if resume_tx_hash:
+            try:
+                self.w3.eth.get_transaction(resume_tx_hash)
+            except TransactionNotFound:
+                nonce = self._resend_nonce(account.address, resume_nonce)
+            else:
+                receipt = self.w3.eth.wait_for_transaction_receipt(resume_tx_hash)
+                self.state.delete("evm:block_number")
+                return receipt
+        reserved = nonce is None
+        if reserved:
+            nonce = self._next_nonce(account.address)
+        try:
+            tx = function_call.build_transaction({
+                "from": account.address,
+                "nonce": nonce,
+                "gas": gas,
+                "gasPrice": self.w3.eth.gas_price,
+                "chainId": self.chain_id
+            })
+            signed_tx = account.sign_transaction(tx)
+            tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
+        except Exception:
+            if reserved:
+                self.state.release_nonce(account.address, nonce)
+            raise
+        if on_sent is not None:
+            on_sent(tx_hash.hex(), nonce)
+        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        self.state.delete("evm:block_number")
+        return receipt
+    
+    def _resend_nonce(self, address: str, dropped_nonce: Optional[int]) -> Optional[int]:
+        """Nonce for resending a dropped transaction, or None to reserve a fresh one
+
+        The dropped nonce is reused while it is still unmined. Once another
+        transaction has been mined with it, the dropped one can never be
+        mined, so sending with a fresh nonce is safe.
+        """
+        if dropped_nonce is None:
+            raise Exception("Earlier transaction was dropped and its nonce is unknown; not resending")
+        if dropped_nonce >= self.w3.eth.get_transaction_count(address, "latest"):
+            return dropped_nonce
+        return None
+    
+    async def get_block_number(self) -> int:
+        """Get the latest block number, cached for LEDGER_HEIGHT_CACHE_TTL seconds"""
+        block_number = self.state.get("evm:block_number")
+        if block_number is None:
+            block_number = self.w3.eth.block_number
+            self.state.set("evm:block_number", block_number, ttl=self.block_number_ttl)
+        return block_number
+    
+    async def mint_erc20(self, to_address: str, amount: str,
+                         resume_tx_hash: Optional[str] = None,
+                         resume_nonce: Optional[int] = None,
+                         on_sent: Optional[Callable[[str, int], None]] = None) -> Dict[str, Any]:
         """Mint ERC20 tokens"""
         if not self.token_address:
             raise Exception("ERC20 token not deployed. Run contract deployment first.")
@@ -84,22 +237,14 @@ class EVMService:
         if not abi:
             raise Exception("Could not load ERC20 ABI")
         
-        contract = self.w3.eth.contract(address=self.token_address, abi=abi)
+        contract = self._get_contract(self.token_address, "erc20/GreenSupplyToken.sol")
         
-        # Build transaction
+        # Build, sign and send transaction
         amount_wei = self.w3.to_wei(amount, "ether")
-        tx = contract.functions.mint(to_address, amount_wei).build_transaction({
-            "from": account.address,
-            "nonce": self.w3.eth.get_transaction_count(account.address),
-            "gas": 100000,
-            "gasPrice": self.w3.eth.gas_price,
-            "chainId": self.chain_id
-        })
-        
-        # Sign and send
-        signed_tx = account.sign_transaction(tx)
-        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        receipt = self._send_transaction(
+            account, contract.functions.mint(to_address, amount_wei), gas=100000,
+            resume_tx_hash=resume_tx_hash, resume_nonce=resume_nonce, on_sent=on_sent
+        )
         
         return {
             "txHash": receipt.transactionHash.hex(),
@@ -108,7 +253,10 @@ class EVMService:
             "amount": amount
         }
     
-    async def mint_erc721(self, to_address: str, token_id: Optional[int], metadata_uri: str) -> Dict[str, Any]:
+    async def mint_erc721(self, to_address: str, token_id: Optional[int], metadata_uri: str,
+                          resume_tx_hash: Optional[str] = None,
+                          resume_nonce: Optional[int] = None,
+                          on_sent: Optional[Callable[[str, int], None]] = None) -> Dict[str, Any]:
         """Mint ERC721 NFT"""
         if not self.nft_address:
             raise Exception("ERC721 NFT not deployed. Run contract deployment first.")
@@ -119,21 +267,13 @@ class EVMService:
         if not abi:
             raise Exception("Could not load ERC721 ABI")
         
-        contract = self.w3.eth.contract(address=self.nft_address, abi=abi)
-        
-        # Build transaction
-        tx = contract.functions.mint(to_address, metadata_uri).build_transaction({
-            "from": account.address,
-            "nonce": self.w3.eth.get_transaction_count(account.address),
-            "gas": 200000,
-            "gasPrice": self.w3.eth.gas_price,
-            "chainId": self.chain_id
-        })
+        contract = self._get_contract(self.nft_address, "erc721/GreenSupplyNFT.sol")
         
-        # Sign and send
-        signed_tx = account.sign_transaction(tx)
-        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.rawTransaction)
-        receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+        # Build, sign and send transaction
+        receipt = self._send_transaction(
+            account, contract.functions.mint(to_address, metadata_uri), gas=200000,
+            resume_tx_hash=resume_tx_hash, resume_nonce=resume_nonce, on_sent=on_sent
+        )
         
         # Get minted token ID from events
         token_id_minted = None
@@ -143,8 +283,9 @@ class EVMService:
                     event = contract.events.NFTMinted().process_log(log)
                     token_id_minted = event.args.tokenId
                     break
-                except:
-                    pass
+                except MismatchedABI:
+                    # Transfer and other events share the receipt
+                    continue
         
         return {
             "txHash": receipt.transactionHash.hex(),
@@ -163,10 +304,97 @@ class EVMService:
         if not abi:
             raise Exception("Could not load ERC20 ABI")
         
-        contract = self.w3.eth.contract(address=self.token_address, abi=abi)
+        contract = self._get_contract(self.token_address, "erc20/GreenSupplyToken.sol")
         balance = contract.functions.balanceOf(address).call()
         return self.w3.from_wei(balance, "ether")
     
+    async def get_erc20_balances(self, addresses: List[str]) -> Dict[str, Any]:
+        """Get ERC20 balances for many addresses at one block height
+
+        The balanceOf calls are sent as JSON-RPC batches of EVM_RPC_BATCH_SIZE,
+        all pinned to the same block so the snapshot is consistent.
+        """
+        if not self.token_address:
+            raise Exception("ERC20 token not deployed")
+        if not self._get_contract_abi("erc20/GreenSupplyToken.sol"):
+            raise Exception("Could not load ERC20 ABI")
+        
+        contract = self._get_contract(self.token_address, "erc20/GreenSupplyToken.sol")
+        block_number = self.w3.eth.block_number
+        balances: List[Dict[str, Any]] = [{"address": address} for address in addresses]
+        
+        calls = []
+        for i, address in enumerate(addresses):
+            if not Web3.is_address(address):
+                balances[i]["error"] = "Invalid address"
+                continue
+            data = contract.encodeABI(fn_name="balanceOf", args=[Web3.to_checksum_address(address)])
+            calls.append((i, data))
+        
+        batch_size = int(os.getenv("EVM_RPC_BATCH_SIZE", "200"))
+        for start in range(0, len(calls), batch_size):
+            chunk = calls[start:start + batch_size]
+            for i, outcome in zip((i for i, _ in chunk), self._batch_eth_call(
+                self.token_address, [data for _, data in chunk], block_number
+            )):
+                if isinstance(outcome, Exception):
+                    balances[i]["error"] = str(outcome)
+                else:
+                    balances[i]["balance"] = str(self.w3.from_wei(outcome, "ether"))
+        
+        return {"blockNumber": block_number, "balances": balances}
+    
+    def _batch_eth_call(self, to: str, call_data: List[str], block_number: int) -> List[Any]:
+        """Run eth_calls in one JSON-RPC batch; each result is an int or an Exception"""
+        block = hex(block_number)
+        payload = [
+            {"jsonrpc": "2.0", "id": i, "method": "eth_call", "params": [{"to": to, "data": data}, block]}
+            for i, data in enumerate(call_data)
+        ]
+        with tracing.span("rpc.batch", method="eth_call", calls=len(payload)):
+            response = self._http_session().post(self.rpc_url, json=payload, timeout=30)
+            response.raise_for_status()
+            replies = response.json()
+        if not isinstance(replies, list):
+            # Node does not support batching; fall back to one call at a time
+            return [self._single_eth_call(to, data, block_number) for data in call_data]
+        
+        by_id = {reply.get("id"): reply for reply in replies}
+        results: List[Any] = []
+        for i in range(len(call_data)):
+            reply = by_id.get(i)
+            if reply is None:
+                results.append(Exception("No response from node"))
+            elif "error" in reply:
+                results.append(Exception(reply["error"].get("message", "eth_call failed")))
+            else:
+                results.append(int(reply["result"], 16) if reply["result"] not in ("0x", None) else 0)
+        return results
+    
+    def _single_eth_call(self, to: str, data: str, block_number: int) -> Any:
+        try:
+            return int.from_bytes(self.w3.eth.call({"to": to, "data": data}, block_number), "big")
+        except Exception as e:
+            return e
+    
+    async def get_erc20_transfers(self, from_block: int, to_block: int) -> List[Dict[str, Any]]:
+        """Get ERC20 Transfer events (including mints and burns) in a block range"""
+        if not self.token_address:
+            return []
+        if not self._get_contract_abi("erc20/GreenSupplyToken.sol"):
+            raise Exception("Could not load ERC20 ABI")
+        contract = self._get_contract(self.token_address, "erc20/GreenSupplyToken.sol")
+        transfers = contract.events.Transfer.get_logs(fromBlock=from_block, toBlock=to_block)
+        return [
+            {
+                "from": event.args["from"],
+                "to": event.args["to"],
+                "value": int(event.args["value"]),
+                "blockNumber": event.blockNumber
+            }
+            for event in transfers
+        ]
+    
     async def get_evm_transactions(self, limit: int = 50) -> List[Dict[str, Any]]:
         """Get recent EVM blockchain transactions"""
         try:
@@ -176,27 +404,30 @@ class EVMService:
             # Get transactions from recent blocks
             for block_num in range(max(0, latest_block - limit), latest_block + 1):
                 try:
-                    block = self.w3.eth.get_block(block_num, full_transactions=True)
-                    for tx in block.transactions:
-                        if tx.to and (tx.to.lower() == self.token_address.lower() or 
-                                     tx.to.lower() == self.nft_address.lower()):
-                            receipt = self.w3.eth.get_transaction_receipt(tx.hash)
-                            transactions.append({
-                                "hash": tx.hash.hex(),
-                                "blockNumber": block_num,
-                                "from": tx["from"],
-                                "to": tx.to,
-                                "value": str(self.w3.from_wei(tx.value, "ether")),
-                                "gasUsed": receipt.gasUsed,
-                                "status": "success" if receipt.status == 1 else "failed",
-                                "timestamp": block.timestamp,
-                                "type": "ERC20" if tx.to.lower() == self.token_address.lower() else "ERC721"
-                            })
+                    with tracing.span("evm.scan_block", blockNumber=block_num):
+                        block = self.w3.eth.get_block(block_num, full_transactions=True)
+                        for tx in block.transactions:
+                            if tx.to and (tx.to.lower() == self.token_address.lower() or 
+                                         tx.to.lower() == self.nft_address.lower()):
+                                receipt = self.w3.eth.get_transaction_receipt(tx.hash)
+                                transactions.append({
+                                    "hash": tx.hash.hex(),
+                                    "blockNumber": block_num,
+                                    "from": tx["from"],
+                                    "to": tx.to,
+                                    "value": str(self.w3.from_wei(tx.value, "ether")),
+                                    "gasUsed": receipt.gasUsed,
+                                    "status": "success" if receipt.status == 1 else "failed",
+                                    "timestamp": block.timestamp,
+                                    "type": "ERC20" if tx.to.lower() == self.token_address.lower() else "ERC721"
+                                })
                 except Exception as e:
+                    tracing.record_error(e, blockNumber=block_num)
                     continue
             
             return sorted(transactions, key=lambda x: x["blockNumber"], reverse=True)[:limit]
         except Exception as e:
+            tracing.record_error(e)
             print(f"Error getting EVM transactions: {e}")
             return []
     
@@ -208,7 +439,7 @@ class EVMService:
             if self.token_address:
                 abi = self._get_contract_abi("erc20/GreenSupplyToken.sol")
                 if abi:
-                    contract = self.w3.eth.contract(address=self.token_address, abi=abi)
+                    contract = self._get_contract(self.token_address, "erc20/GreenSupplyToken.sol")
                     latest_block = self.w3.eth.block_number
                     from_block = max(0, latest_block - 1000)
                     
@@ -225,13 +456,14 @@ class EVMService:
                                 "txHash": event.transactionHash.hex(),
                                 "timestamp": self.w3.eth.get_block(event.blockNumber).timestamp
                             })
-                    except:
-                        pass
+                    except Exception as e:
+                        tracing.record_error(e, event="TokensMinted")
+                        print(f"Error reading TokensMinted events: {e}")
             
             if self.nft_address:
                 abi = self._get_contract_abi("erc721/GreenSupplyNFT.sol")
                 if abi:
-                    contract = self.w3.eth.contract(address=self.nft_address, abi=abi)
+                    contract = self._get_contract(self.nft_address, "erc721/GreenSupplyNFT.sol")
                     latest_block = self.w3.eth.block_number
                     from_block = max(0, latest_block - 1000)
                     
@@ -249,42 +481,67 @@ class EVMService:
                                 "txHash": event.transactionHash.hex(),
                                 "timestamp": self.w3.eth.get_block(event.blockNumber).timestamp
                             })
-                    except:
-                        pass
+                    except Exception as e:
+                        tracing.record_error(e, event="NFTMinted")
+                        print(f"Error reading NFTMinted events: {e}")
             
             return sorted(events, key=lambda x: x["blockNumber"], reverse=True)[:limit]
         except Exception as e:
+            tracing.record_error(e)
             print(f"Error getting smart contract events: {e}")
             return []
     
+    async def get_nft_mints(self, from_block: int, to_block: int) -> List[Dict[str, Any]]:
+        """Get NFTMinted events in a block range, oldest first"""
+        if not self.nft_address:
+            return []
+        if not self._get_contract_abi("erc721/GreenSupplyNFT.sol"):
+            raise Exception("Could not load ERC721 ABI")
+        contract = self._get_contract(self.nft_address, "erc721/GreenSupplyNFT.sol")
+        mint_events = contract.events.NFTMinted.get_logs(fromBlock=from_block, toBlock=to_block)
+        return [
+            {
+                "tokenId": int(event.args.tokenId),
+                "tokenURI": event.args.tokenURI,
+                "to": event.args.to,
+                "contract": self.nft_address,
+                "blockNumber": event.blockNumber,
+                "txHash": event.transactionHash.hex()
+            }
+            for event in mint_events
+        ]
+    
+    async def iter_tokenized_assets(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield tokenized assets one at a time as they are read from the NFT contract"""
+        if not self.nft_address:
+            return
+        abi = self._get_contract_abi("erc721/GreenSupplyNFT.sol")
+        if not abi:
+            return
+        contract = self._get_contract(self.nft_address, "erc721/GreenSupplyNFT.sol")
+        total_supply = contract.functions.totalSupply().call()
+
+        # Get all NFTs
+        for token_id in range(1, min(total_supply + 1, 100)):  # Limit to 100
+            try:
+                owner = contract.functions.ownerOf(token_id).call()
+                token_uri = contract.functions.tokenURI(token_id).call()
+            except Exception as e:
+                # Burned or not-yet-minted ids revert; skip them
+                tracing.record_error(e, tokenId=token_id)
+                continue
+            yield {
+                "tokenId": str(token_id),
+                "owner": owner,
+                "tokenURI": token_uri,
+                "contract": self.nft_address,
+                "type": "ERC721"
+            }
+
     async def get_tokenized_assets(self) -> List[Dict[str, Any]]:
         """Get all tokenized assets (NFTs representing supply chain assets)"""
         try:
-            tokenized = []
-            
-            if self.nft_address:
-                abi = self._get_contract_abi("erc721/GreenSupplyNFT.sol")
-                if abi:
-                    contract = self.w3.eth.contract(address=self.nft_address, abi=abi)
-                    total_supply = contract.functions.totalSupply().call()
-                    
-                    # Get all NFTs
-                    for token_id in range(1, min(total_supply + 1, 100)):  # Limit to 100
-                        try:
-                            owner = contract.functions.ownerOf(token_id).call()
-                            token_uri = contract.functions.tokenURI(token_id).call()
-                            tokenized.append({
-                                "tokenId": str(token_id),
-                                "owner": owner,
-                                "tokenURI": token_uri,
-                                "contract": self.nft_address,
-                                "type": "ERC721"
-                            })
-                        except:
-                            continue
-            
-            return tokenized
+            return [asset async for asset in self.iter_tokenized_assets()]
         except Exception as e:
             print(f"Error getting tokenized assets: {e}")
             return []
-
@@ -1,59 +1,96 @@
 import os
 import json
+import time
+import asyncio
+import codecs
 import subprocess
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, AsyncIterator
+
+from services import serialization, tracing
+from services.json_stream import IncompleteArrayError, JSONArrayStream
+from services.shared_state import SharedState
+from services.peer_router import Peer, PeerRouter, PeerUnavailable, is_unreachable
+from services.records import AssetRecord, HistoryRecord, asset_from_chaincode, history_from_chaincode
+
+# Size of each read from the peer CLI's stdout when streaming query results
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# How much of the peer CLI's stderr is kept for error messages while streaming
+STDERR_TAIL_SIZE = 16 * 1024
 
 class FabricService:
     """Service for interacting with Hyperledger Fabric network"""
     
-    def __init__(self):
+    def __init__(self, state: Optional[SharedState] = None):
         self.peer_address = os.getenv("FABRIC_PEER_ADDRESS", "localhost:7051")
         self.orderer_address = os.getenv("FABRIC_ORDERER_ADDRESS", "localhost:7050")
         self.channel_name = os.getenv("FABRIC_CHANNEL_NAME", "supplychain")
         self.chaincode_name = os.getenv("FABRIC_CHAINCODE_NAME", "assetcc")
         self.org_name = os.getenv("FABRIC_ORG_NAME", "Org1")
         self.msp_id = os.getenv("FABRIC_MSP_ID", "Org1MSP")
+        # Cross-worker cache; process-local unless one is passed in
+        self.state = state or SharedState(":memory:")
+        # Ledger height is cached briefly so conditional GETs rarely touch the peer.
+        # Our own invokes drop it, but a write by another org within the TTL can
+        # still be answered with a 304 until the cached height expires.
+        self.ledger_height_ttl = float(os.getenv("LEDGER_HEIGHT_CACHE_TTL", "2"))
+        # Spreads queries and endorsements over the peers in FABRIC_PEERS
+        self.router = PeerRouter()
     
     async def _invoke_chaincode(self, function_name: str, *args) -> Dict[str, Any]:
         """Invoke chaincode function using peer CLI"""
-        container_name = f"peer0.{self.org_name.lower()}.example.com"
-        
-        # Check if container is running
-        if not self._check_docker_container(container_name):
-            raise Exception(
-                f"Fabric network is not running. Container '{container_name}' not found. "
-                f"Please start the Fabric network with: make start-fabric"
-            )
+        with tracing.span("fabric.invoke", function=function_name):
+            return await self._invoke_chaincode_cli(function_name, *args)
+
+    async def _invoke_chaincode_cli(self, function_name: str, *args) -> Dict[str, Any]:
+        running = self._running_peers()
+        gateway = self._submitting_peer(running)
+        # The router only picks who endorses; the gateway's CLI collects those
+        # endorsements in parallel and submits under our own org's identity
+        endorsers = self.router.endorsers(running)
         
         try:
             # Construct peer command
             cmd = [
-                "docker", "exec", container_name,
+                "docker", "exec", "-e", f"CORE_PEER_LOCALMSPID={self.msp_id}", gateway.container,
                 "peer", "chaincode", "invoke",
                 "-o", self.orderer_address,
                 "--tls", "--cafile", "/opt/gopath/src/github.com/hyperledger/fabric/peer/crypto/ordererOrganizations/example.com/orderers/orderer.example.com/msp/tlscacerts/tlsca.example.com-cert.pem",
                 "-C", self.channel_name,
                 "-n", self.chaincode_name,
+                # Return once the block is committed, so the height dropped below is really stale
+                "--waitForEvent",
+            ]
+            for peer in endorsers:
+                cmd += ["--peerAddresses", peer.address, "--tlsRootCertFiles", peer.tls_root_cert]
+            cmd += [
                 "-c", json.dumps({
                     "function": function_name,
                     "Args": list(args)
                 })
             ]
             
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=30
-            )
+            # Invoke time includes ordering, so it is not fed into the query latency averages
+            with self.router.use(gateway, measure=False):
+                try:
+                    result = self._run_cli(cmd, timeout=30)
+                except subprocess.TimeoutExpired:
+                    raise PeerUnavailable("Invocation timed out. Fabric network may be slow or unresponsive.")
             
             if result.returncode != 0:
                 error_msg = result.stderr or result.stdout
+                if is_unreachable(error_msg):
+                    # Cool down whichever endorsers the CLI could not reach
+                    for peer in endorsers:
+                        if peer.host in error_msg:
+                            self.router.record_failure(peer)
                 raise Exception(f"Chaincode invocation failed: {error_msg}")
             
-            return {"status": "success", "output": result.stdout}
-        except subprocess.TimeoutExpired:
-            raise Exception("Invocation timed out. Fabric network may be slow or unresponsive.")
+            # Our own committed write moves the ledger forward; don't serve a stale height
+            self.state.delete(self._ledger_height_key)
+            return {"status": "success", "output": result.stdout, "endorsers": [peer.address for peer in endorsers]}
+        except PeerUnavailable as e:
+            raise Exception(str(e))
         except FileNotFoundError:
             raise Exception("Docker not found. Please install Docker and ensure it's running.")
         except Exception as e:
@@ -61,106 +98,332 @@ class FabricService:
                 raise
             raise Exception(f"Error invoking chaincode: {str(e)}")
     
+    def _run_cli(self, cmd: List[str], timeout: float) -> subprocess.CompletedProcess:
+        """Run a docker/peer CLI command, timed as a span when the request is traced"""
+        # The chaincode payload after "-c" can be large; the span only names the command
+        command = cmd[:cmd.index("-c")] if "-c" in cmd else cmd
+        with tracing.span("subprocess", command=" ".join(command[:8]), timeout=timeout) as current:
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+            if current is not None:
+                current.attributes["returncode"] = result.returncode
+            return result
+
+    def _running_containers(self) -> set:
+        """Names of all running Docker containers, from one `docker ps`"""
+        try:
+            result = self._run_cli(["docker", "ps", "--format", "{{.Names}}"], timeout=5)
+            return set(result.stdout.split())
+        except Exception:
+            return set()
+
     def _check_docker_container(self, container_name: str) -> bool:
         """Check if Docker container is running"""
-        try:
-            result = subprocess.run(
-                ["docker", "ps", "--format", "{{.Names}}"],
-                capture_output=True,
-                text=True,
-                timeout=5
-            )
-            return container_name in result.stdout
-        except:
-            return False
+        return container_name in self._running_containers()
     
-    async def _query_chaincode(self, function_name: str, *args) -> Dict[str, Any]:
-        """Query chaincode function using peer CLI"""
-        container_name = f"peer0.{self.org_name.lower()}.example.com"
-        
-        # Check if container is running
-        if not self._check_docker_container(container_name):
+    def _running_peers(self) -> List[Peer]:
+        """Configured peers whose containers are up; peers found down are put in cooldown"""
+        running = self._running_containers()
+        peers = []
+        for peer in self.router.peers:
+            if peer.container in running:
+                peers.append(peer)
+            else:
+                self.router.record_failure(peer)
+        if not peers:
+            names = ", ".join(peer.container for peer in self.router.peers)
             raise Exception(
-                f"Fabric network is not running. Container '{container_name}' not found. "
+                f"Fabric network is not running. No peer container found among: {names}. "
                 f"Please start the Fabric network with: make start-fabric"
             )
-        
-        try:
-            cmd = [
-                "docker", "exec", container_name,
-                "peer", "chaincode", "query",
-                "-C", self.channel_name,
-                "-n", self.chaincode_name,
-                "-c", json.dumps({
-                    "function": function_name,
-                    "Args": list(args)
-                })
-            ]
-            
-            result = subprocess.run(
-                cmd,
-                capture_output=True,
-                text=True,
-                timeout=30
+        return peers
+
+    def _submitting_peer(self, running: List[Peer]) -> Peer:
+        """A running peer of FABRIC_ORG_NAME, whose CLI signs and submits our transactions
+
+        Submitting through another org's peer would record that org as the
+        creator in the chaincode's transferredBy/updatedBy fields.
+        """
+        own = [peer for peer in running if peer.org == self.org_name.lower()]
+        if not own:
+            raise Exception(
+                f"Fabric network is not running. No peer container for {self.org_name} is running. "
+                f"Please start the Fabric network with: make start-fabric"
             )
-            
-            if result.returncode != 0:
-                error_msg = result.stderr or result.stdout
-                raise Exception(f"Chaincode query failed: {error_msg}")
-            
-            output = result.stdout.strip()
-            if not output:
-                return []
-            
-            try:
-                return json.loads(output)
-            except json.JSONDecodeError:
-                return {"raw": output}
-        except subprocess.TimeoutExpired:
-            raise Exception("Query timed out. Fabric network may be slow or unresponsive.")
+        return self.router.candidates(own)[0]
+
+    def _query_command(self, peer: Peer, function_name: str, *args) -> List[str]:
+        return [
+            "docker", "exec", peer.container,
+            "peer", "chaincode", "query",
+            "-C", self.channel_name,
+            "-n", self.chaincode_name,
+            "-c", json.dumps({
+                "function": function_name,
+                "Args": list(args)
+            })
+        ]
+
+    async def _query_chaincode(self, function_name: str, *args) -> Dict[str, Any]:
+        """Query chaincode function using peer CLI"""
+        with tracing.span("fabric.query", function=function_name):
+            return await self._query_chaincode_cli(function_name, *args)
+
+    async def _query_chaincode_cli(self, function_name: str, *args) -> Dict[str, Any]:
+        try:
+            # Queries are read-only, so a peer that cannot be reached is retried elsewhere
+            for peer in self.router.candidates(self._running_peers()):
+                try:
+                    return self._query_peer(peer, function_name, *args)
+                except PeerUnavailable as e:
+                    last_error = e
+            raise last_error
         except FileNotFoundError:
             raise Exception("Docker not found. Please install Docker and ensure it's running.")
         except Exception as e:
             if "Fabric network is not running" in str(e):
                 raise
             raise Exception(f"Error querying chaincode: {str(e)}")
+
+    def _query_peer(self, peer: Peer, function_name: str, *args) -> Any:
+        """Run one chaincode query on one peer"""
+        with self.router.use(peer):
+            try:
+                result = self._run_cli(self._query_command(peer, function_name, *args), timeout=30)
+            except subprocess.TimeoutExpired:
+                raise PeerUnavailable("Query timed out. Fabric network may be slow or unresponsive.")
+            
+            if result.returncode != 0:
+                error_msg = result.stderr or result.stdout
+                if is_unreachable(error_msg):
+                    raise PeerUnavailable(f"Chaincode query failed: {error_msg}")
+                raise Exception(f"Chaincode query failed: {error_msg}")
+        
+        output = result.stdout.strip()
+        if not output:
+            return []
+        
+        try:
+            with tracing.span("json.parse", bytes=len(output)):
+                return serialization.loads(output)
+        except ValueError:
+            return {"raw": output}
     
+    async def _stream_query_chaincode(self, function_name: str, *args) -> AsyncIterator[Any]:
+        """Query chaincode and yield the elements of its JSON array result as they arrive
+
+        Unlike _query_chaincode, the peer's stdout is never held in full:
+        it is read in chunks and decoded incrementally. A peer that cannot be
+        reached is retried elsewhere as long as nothing has been yielded yet.
+        """
+        last_error = None
+        for peer in self.router.candidates(self._running_peers()):
+            yielded = False
+            try:
+                async for item in self._stream_query_peer(peer, function_name, *args):
+                    yielded = True
+                    yield item
+                return
+            except PeerUnavailable as e:
+                if yielded:
+                    raise Exception(str(e))
+                last_error = e
+        raise Exception(str(last_error))
+
+    async def _stream_query_peer(self, peer: Peer, function_name: str, *args) -> AsyncIterator[Any]:
+        cmd = self._query_command(peer, function_name, *args)
+
+        # Not made current: the generator yields to its consumer between chunks
+        stream_span = tracing.start_span("fabric.stream_query", function=function_name, peer=peer.address)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+        except FileNotFoundError:
+            tracing.finish_span(stream_span, error="Docker not found")
+            raise Exception("Docker not found. Please install Docker and ensure it's running.")
+
+        # Drained concurrently: a chatty peer could otherwise fill the stderr
+        # pipe and block while we are still waiting on stdout
+        stderr_tail = bytearray()
+
+        async def drain_stderr():
+            while True:
+                chunk = await process.stderr.read(STREAM_CHUNK_SIZE)
+                if not chunk:
+                    return
+                stderr_tail.extend(chunk)
+                del stderr_tail[:-STDERR_TAIL_SIZE]
+
+        stderr_task = asyncio.ensure_future(drain_stderr())
+        self.router.acquire(peer)
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        parser = JSONArrayStream()
+        items = 0
+        started = time.perf_counter()
+        first_chunk_ms = None
+        try:
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(process.stdout.read(STREAM_CHUNK_SIZE), timeout=30)
+                except asyncio.TimeoutError:
+                    self.router.record_failure(peer)
+                    raise PeerUnavailable("Query timed out. Fabric network may be slow or unresponsive.")
+                if first_chunk_ms is None:
+                    # Time to first byte; the full duration depends on result size
+                    first_chunk_ms = (time.perf_counter() - started) * 1000
+                if not chunk:
+                    break
+                for item in parser.feed(decoder.decode(chunk)):
+                    items += 1
+                    yield item
+
+            returncode = await process.wait()
+            if returncode != 0:
+                await stderr_task
+                error_msg = bytes(stderr_tail).decode("utf-8", "replace")
+                if is_unreachable(error_msg):
+                    self.router.record_failure(peer)
+                    raise PeerUnavailable(f"Chaincode query failed: {error_msg}")
+                raise Exception(f"Chaincode query failed: {error_msg}")
+            self.router.record_success(peer, first_chunk_ms)
+
+            try:
+                remaining = parser.feed(decoder.decode(b"", final=True)) + parser.close()
+            except IncompleteArrayError as e:
+                # Records are missing; never let the list pass as complete
+                raise Exception(f"Chaincode query returned incomplete output: {e}")
+            except ValueError:
+                # Non-JSON output carries no records, matching get_all_assets
+                remaining = []
+            for item in remaining:
+                items += 1
+                yield item
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            if not stderr_task.done():
+                stderr_task.cancel()
+                try:
+                    await stderr_task
+                except asyncio.CancelledError:
+                    pass
+            self.router.release(peer)
+            tracing.finish_span(stream_span, items=items, returncode=process.returncode)
+
     async def create_asset(self, org_id: str, asset_id: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new asset on the ledger"""
         metadata_str = json.dumps(metadata)
         result = await self._invoke_chaincode("CreateAsset", asset_id, org_id, metadata_str)
         return result
     
-    async def read_asset(self, asset_id: str) -> Dict[str, Any]:
+    async def read_asset(self, asset_id: str) -> AssetRecord:
         """Read an asset from the ledger"""
         result = await self._query_chaincode("ReadAsset", asset_id)
-        return result
+        return asset_from_chaincode(result)
     
     async def transfer_asset(self, asset_id: str, new_owner: str) -> Dict[str, Any]:
         """Transfer asset ownership"""
         result = await self._invoke_chaincode("TransferAsset", asset_id, new_owner)
         return result
     
-    async def get_all_assets(self) -> List[Dict[str, Any]]:
+    async def get_all_assets(self) -> List[AssetRecord]:
         """Get all assets from the ledger"""
         result = await self._query_chaincode("GetAllAssets")
+        # A {"raw": ...} result means the output was not JSON; it holds no records
         if isinstance(result, dict) and "raw" in result:
-            try:
-                return json.loads(result["raw"])
-            except:
-                return []
-        return result if isinstance(result, list) else [result]
+            return []
+        result = result if isinstance(result, list) else [result]
+        return [asset_from_chaincode(asset) for asset in result]
     
-    async def get_asset_history(self, asset_id: str) -> List[Dict[str, Any]]:
+    async def get_asset_history(self, asset_id: str) -> List[HistoryRecord]:
         """Get transaction history for an asset"""
         result = await self._query_chaincode("GetAssetHistory", asset_id)
         if isinstance(result, dict) and "raw" in result:
-            try:
-                return json.loads(result["raw"])
-            except:
-                return []
-        return result if isinstance(result, list) else [result]
+            return []
+        result = result if isinstance(result, list) else [result]
+        return [history_from_chaincode(entry) for entry in result]
     
+    async def iter_all_assets(self) -> AsyncIterator[AssetRecord]:
+        """Stream all assets from the ledger without buffering the full result"""
+        async for asset in self._stream_query_chaincode("GetAllAssets"):
+            yield asset_from_chaincode(asset)
+
+    async def iter_asset_history(self, asset_id: str) -> AsyncIterator[HistoryRecord]:
+        """Stream the transaction history for an asset"""
+        async for entry in self._stream_query_chaincode("GetAssetHistory", asset_id):
+            yield history_from_chaincode(entry)
+
+    @property
+    def _ledger_height_key(self) -> str:
+        return f"fabric:{self.channel_name}:height"
+
+    async def get_ledger_height(self) -> int:
+        """Get the channel's block height, cached for LEDGER_HEIGHT_CACHE_TTL seconds
+
+        Peers may trail each other by a block or two, and a query may be
+        answered by any of them. The lowest height among the healthy peers
+        is returned, so an ETag built from it never claims a block that the
+        peer serving the body might not have yet.
+        """
+        height = self.state.get(self._ledger_height_key)
+        if height is not None:
+            return height
+
+        with tracing.span("fabric.ledger_height"):
+            now = time.time()
+            peers = [peer for peer in self.router.peers if peer.healthy(now)] or self.router.peers
+            results = await asyncio.gather(*(self._peer_height(peer) for peer in peers), return_exceptions=True)
+            heights = []
+            last_error = None
+            for result in results:
+                if isinstance(result, PeerUnavailable):
+                    last_error = result
+                elif isinstance(result, BaseException):
+                    raise result
+                else:
+                    heights.append(result)
+            if not heights:
+                raise Exception(str(last_error))
+            height = min(heights)
+
+        self.state.set(self._ledger_height_key, height, ttl=self.ledger_height_ttl)
+        return height
+
+    async def _peer_height(self, peer: Peer) -> int:
+        with self.router.use(peer):
+            return await self._read_ledger_height(peer)
+
+    async def _read_ledger_height(self, peer: Peer) -> int:
+        """Run `peer channel getinfo` on one peer"""
+        try:
+            process = await asyncio.create_subprocess_exec(
+                "docker", "exec", peer.container,
+                "peer", "channel", "getinfo", "-c", self.channel_name,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE
+            )
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=10)
+        except FileNotFoundError:
+            raise Exception("Docker not found. Please install Docker and ensure it's running.")
+        except asyncio.TimeoutError:
+            process.kill()
+            # Reap the child so it neither lingers as a zombie nor outlives the loop's transport
+            await process.wait()
+            raise PeerUnavailable("Ledger height query timed out. Fabric network may be slow or unresponsive.")
+
+        # The CLI prints "Blockchain info: {...}" (on stderr for some peer versions)
+        output = (stdout + stderr).decode("utf-8", "replace")
+        marker = "Blockchain info:"
+        if process.returncode != 0 or marker not in output:
+            if is_unreachable(output):
+                raise PeerUnavailable(f"Could not read ledger height from {peer.address}: {output.strip()}")
+            raise Exception(f"Could not read ledger height: {output.strip()}")
+        info = json.loads(output.split(marker, 1)[1].strip().splitlines()[0])
+        return int(info["height"])
+
     async def check_network_health(self) -> Dict[str, Any]:
         """Check if Fabric network is healthy and nodes can join"""
         health_status = {
@@ -173,18 +436,21 @@ class FabricService:
         
         # Check if Docker is available
         try:
-            subprocess.run(["docker", "--version"], capture_output=True, timeout=5)
-        except:
+            self._run_cli(["docker", "--version"], timeout=5)
+        except Exception as e:
+            tracing.record_error(e, check="docker")
             health_status["errors"].append("Docker is not installed or not in PATH")
             return health_status
         
-        # Check each organization's peer
-        orgs = ["org1", "org2", "org3"]
-        for org in orgs:
-            container_name = f"peer0.{org}.example.com"
-            is_running = self._check_docker_container(container_name)
+        # Check each configured peer
+        running_containers = self._running_containers()
+        for peer in self.router.peers:
+            container_name = peer.container
+            is_running = container_name in running_containers
+            # Keyed by org; further peers of the same org by container name
+            node_key = peer.org if peer.org not in health_status["nodes"] else container_name
             
-            health_status["nodes"][org] = {
+            health_status["nodes"][node_key] = {
                 "container_running": is_running,
                 "peer_accessible": False,
                 "channel_joined": False,
@@ -195,42 +461,38 @@ class FabricService:
             if is_running:
                 try:
                     # Try to query peer info
-                    result = subprocess.run(
-                        ["docker", "exec", container_name, "peer", "node", "status"],
-                        capture_output=True,
-                        text=True,
-                        timeout=10
-                    )
-                    health_status["nodes"][org]["peer_accessible"] = result.returncode == 0
+                    result = self._run_cli(["docker", "exec", container_name, "peer", "node", "status"], timeout=10)
+                    health_status["nodes"][node_key]["peer_accessible"] = result.returncode == 0
                     
                     # Check if peer is in channel
-                    result = subprocess.run(
-                        ["docker", "exec", container_name, "peer", "channel", "list"],
-                        capture_output=True,
-                        text=True,
-                        timeout=10
-                    )
+                    result = self._run_cli(["docker", "exec", container_name, "peer", "channel", "list"], timeout=10)
                     if self.channel_name in result.stdout:
-                        health_status["nodes"][org]["channel_joined"] = True
+                        health_status["nodes"][node_key]["channel_joined"] = True
                         health_status["channel_exists"] = True
                     
                     # Check if chaincode is installed
-                    result = subprocess.run(
+                    result = self._run_cli(
                         ["docker", "exec", container_name, "peer", "lifecycle", "chaincode", "queryinstalled"],
-                        capture_output=True,
-                        text=True,
                         timeout=10
                     )
                     if self.chaincode_name in result.stdout:
-                        health_status["nodes"][org]["chaincode_installed"] = True
+                        health_status["nodes"][node_key]["chaincode_installed"] = True
                         health_status["chaincode_installed"] = True
                         
-                except subprocess.TimeoutExpired:
-                    health_status["nodes"][org]["errors"].append("Peer query timed out")
+                except subprocess.TimeoutExpired as e:
+                    tracing.record_error(e, container=container_name)
+                    health_status["nodes"][node_key]["errors"].append("Peer query timed out")
                 except Exception as e:
-                    health_status["nodes"][org]["errors"].append(str(e))
+                    tracing.record_error(e, container=container_name)
+                    health_status["nodes"][node_key]["errors"].append(str(e))
             else:
-                health_status["nodes"][org]["errors"].append(f"Container {container_name} is not running")
+                health_status["nodes"][node_key]["errors"].append(f"Container {container_name} is not running")
+            
+            # Let the router skip peers the health check found unreachable
+            if health_status["nodes"][node_key]["peer_accessible"]:
+                self.router.record_success(peer)
+            else:
+                self.router.record_failure(peer)
         
         # Check orderer
         orderer_name = "orderer.example.com"
@@ -242,15 +504,10 @@ class FabricService:
         
         if orderer_running:
             try:
-                result = subprocess.run(
-                    ["docker", "exec", orderer_name, "orderer", "version"],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
+                result = self._run_cli(["docker", "exec", orderer_name, "orderer", "version"], timeout=10)
                 health_status["orderer"]["accessible"] = result.returncode == 0
-            except:
-                pass
+            except Exception as e:
+                tracing.record_error(e, container=orderer_name)
         
         # Overall network status
         running_nodes = sum(1 for node in health_status["nodes"].values() if node["container_running"])
@@ -260,6 +517,7 @@ class FabricService:
             health_status["channel_exists"]
         )
         
+        health_status["routing"] = self.router.status()
         return health_status
     
     async def get_node_info(self, org_name: str) -> Dict[str, Any]:
@@ -284,22 +542,12 @@ class FabricService:
         
         try:
             # Get peer version
-            result = subprocess.run(
-                ["docker", "exec", container_name, "peer", "version"],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
+            result = self._run_cli(["docker", "exec", container_name, "peer", "version"], timeout=10)
             if result.returncode == 0:
                 info["peer_version"] = result.stdout.strip().split('\n')[0]
             
             # Get channels
-            result = subprocess.run(
-                ["docker", "exec", container_name, "peer", "channel", "list"],
-                capture_output=True,
-                text=True,
-                timeout=10
-            )
+            result = self._run_cli(["docker", "exec", container_name, "peer", "channel", "list"], timeout=10)
             if result.returncode == 0:
                 lines = result.stdout.strip().split('\n')
                 for line in lines:
@@ -307,10 +555,8 @@ class FabricService:
                         info["channels"].append(self.channel_name)
             
             # Get installed chaincodes
-            result = subprocess.run(
+            result = self._run_cli(
                 ["docker", "exec", container_name, "peer", "lifecycle", "chaincode", "queryinstalled"],
-                capture_output=True,
-                text=True,
                 timeout=10
             )
             if result.returncode == 0:
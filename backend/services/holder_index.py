@@ -0,0 +1,174 @@
+import os
+from typing import Any, Dict, List, Optional
+
+from web3 import Web3
+
+from services.shared_state import SharedState
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+# uint256 fits in 78 decimal digits; zero-padding makes text order numeric order
+_BALANCE_DIGITS = 78
+
+
+def _encode(balance: int) -> str:
+    return str(balance).zfill(_BALANCE_DIGITS)
+
+
+class TokenHolderIndex:
+    """ERC20 holder balances maintained from Transfer events
+
+    Mints and burns are Transfers from/to the zero address, so Transfer
+    alone covers TokensMinted, TokensBurned and burnFrom without counting
+    anything twice. Balances live in the shared SQLite store, keyed by token
+    contract so a redeployed token starts from an empty table; each synced
+    block range is applied in the same transaction that advances that
+    contract's cursor, so concurrent workers never apply a range twice.
+    """
+
+    def __init__(self, state: SharedState):
+        self.state = state
+        self.log_chunk = int(os.getenv("EVM_LOG_CHUNK_BLOCKS", "5000"))
+        self._table_ready = False
+
+    def _ensure_table(self, conn):
+        if not self._table_ready:
+            # Tables of the first version were not keyed by contract; they are
+            # only a cache of Transfer events, so they are rebuilt from scratch
+            conn.execute("DROP TABLE IF EXISTS erc20_holders")
+            conn.execute("DROP TABLE IF EXISTS erc20_holder_sync")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS erc20_holder_balances ("
+                "contract TEXT NOT NULL, address TEXT NOT NULL, balance TEXT NOT NULL, "
+                "PRIMARY KEY (contract, address))"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS erc20_holder_balances_balance "
+                "ON erc20_holder_balances (contract, balance)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS erc20_holder_cursors ("
+                "contract TEXT PRIMARY KEY, next_block INTEGER NOT NULL)"
+            )
+            self._table_ready = True
+
+    def synced_block(self, contract: Optional[str]) -> Optional[int]:
+        """Last block whose transfers of `contract` are reflected in the table"""
+        if not contract:
+            return None
+        with self.state.connection() as conn:
+            self._ensure_table(conn)
+            row = conn.execute(
+                "SELECT next_block FROM erc20_holder_cursors WHERE contract = ?", (contract.lower(),)
+            ).fetchone()
+        return row[0] - 1 if row else None
+
+    async def sync(self, evm_service) -> int:
+        """Apply Transfer events of the deployed token up to the latest block; returns events applied"""
+        contract = evm_service.token_address
+        if not contract:
+            # Nothing deployed yet; leave the cursor alone so the first sync after deployment starts at 0
+            return 0
+        contract = contract.lower()
+        latest = await evm_service.get_block_number()
+        synced = self.synced_block(contract)
+        if synced is not None and synced > latest:
+            # The chain was reset (e.g. a fresh Ganache) behind our cursor
+            self._reset(contract)
+        applied = 0
+        while True:
+            synced = self.synced_block(contract)
+            from_block = 0 if synced is None else synced + 1
+            if from_block > latest:
+                return applied
+            to_block = min(latest, from_block + self.log_chunk - 1)
+            transfers = await evm_service.get_erc20_transfers(from_block, to_block)
+            if not self._apply(contract, from_block, to_block, transfers):
+                # Another worker applied this range first; pick up from its cursor
+                continue
+            applied += len(transfers)
+
+    def _reset(self, contract: str) -> None:
+        with self.state.connection() as conn:
+            self._ensure_table(conn)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM erc20_holder_balances WHERE contract = ?", (contract,))
+                conn.execute("DELETE FROM erc20_holder_cursors WHERE contract = ?", (contract,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _apply(self, contract: str, from_block: int, to_block: int, transfers: List[Dict[str, Any]]) -> bool:
+        deltas: Dict[str, int] = {}
+        for transfer in transfers:
+            sender, receiver = transfer["from"].lower(), transfer["to"].lower()
+            if sender != ZERO_ADDRESS:
+                deltas[sender] = deltas.get(sender, 0) - transfer["value"]
+            if receiver != ZERO_ADDRESS:
+                deltas[receiver] = deltas.get(receiver, 0) + transfer["value"]
+
+        with self.state.connection() as conn:
+            self._ensure_table(conn)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT next_block FROM erc20_holder_cursors WHERE contract = ?", (contract,)
+                ).fetchone()
+                if (row[0] if row else 0) != from_block:
+                    conn.execute("ROLLBACK")
+                    return False
+                for address, delta in deltas.items():
+                    current = conn.execute(
+                        "SELECT balance FROM erc20_holder_balances WHERE contract = ? AND address = ?",
+                        (contract, address)
+                    ).fetchone()
+                    balance = (int(current[0]) if current else 0) + delta
+                    if balance > 0:
+                        conn.execute(
+                            "INSERT INTO erc20_holder_balances (contract, address, balance) VALUES (?, ?, ?) "
+                            "ON CONFLICT(contract, address) DO UPDATE SET balance = excluded.balance",
+                            (contract, address, _encode(balance))
+                        )
+                    else:
+                        conn.execute(
+                            "DELETE FROM erc20_holder_balances WHERE contract = ? AND address = ?",
+                            (contract, address)
+                        )
+                conn.execute(
+                    "INSERT INTO erc20_holder_cursors (contract, next_block) VALUES (?, ?) "
+                    "ON CONFLICT(contract) DO UPDATE SET next_block = excluded.next_block",
+                    (contract, to_block + 1)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return True
+
+    def holders(self, contract: Optional[str], limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Holders of `contract` with a non-zero balance, largest first"""
+        if not contract:
+            return []
+        query = "SELECT address, balance FROM erc20_holder_balances WHERE contract = ? ORDER BY balance DESC"
+        params: tuple = (contract.lower(),)
+        if limit is not None:
+            query += " LIMIT ?"
+            params += (limit,)
+        with self.state.connection() as conn:
+            self._ensure_table(conn)
+            rows = conn.execute(query, params).fetchall()
+        return [
+            {"address": Web3.to_checksum_address(address), "balance": str(Web3.from_wei(int(balance), "ether"))}
+            for address, balance in rows
+        ]
+
+    def holder_count(self, contract: Optional[str]) -> int:
+        if not contract:
+            return 0
+        with self.state.connection() as conn:
+            self._ensure_table(conn)
+            return conn.execute(
+                "SELECT COUNT(*) FROM erc20_holder_balances WHERE contract = ?", (contract.lower(),)
+            ).fetchone()[0]
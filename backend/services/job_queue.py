@@ -0,0 +1,345 @@
+import os
+import json
+import hashlib
+import time
+import uuid
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from services import serialization
+from services.shared_state import SharedState
+
+# A handler receives the job's payload and the job itself (for its id and
+# checkpoint) and returns the job result
+JobHandler = Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[Any]]
+
+_COLUMNS = (
+    "id", "kind", "idempotency_key", "payload", "status", "attempts", "max_attempts",
+    "next_run_at", "claimed_at", "checkpoint", "result", "error", "created_at", "updated_at"
+)
+_JSON_COLUMNS = ("payload", "checkpoint", "result")
+
+
+class IdempotencyConflict(Exception):
+    """Raised when an idempotency key is reused for a different request"""
+
+
+def _request_hash(kind: str, payload: Dict[str, Any]) -> str:
+    """Fingerprint of a job request, independent of payload key order"""
+    canonical = json.dumps([kind, payload], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _row_to_job(row) -> Dict[str, Any]:
+    job = dict(zip(_COLUMNS, row))
+    for column in _JSON_COLUMNS:
+        job[column] = json.loads(job[column]) if job[column] is not None else None
+    return {
+        "jobId": job["id"],
+        "kind": job["kind"],
+        "idempotencyKey": job["idempotency_key"],
+        "payload": job["payload"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "maxAttempts": job["max_attempts"],
+        "nextRunAt": job["next_run_at"],
+        "checkpoint": job["checkpoint"] or {},
+        "result": job["result"],
+        "error": job["error"],
+        "createdAt": job["created_at"],
+        "updatedAt": job["updated_at"],
+    }
+
+
+class JobQueue:
+    """Durable write-ahead queue for ledger writes, stored in the shared SQLite file
+
+    A job is persisted before the request is acknowledged, claimed by one
+    worker at a time under a lease, and retried with exponential backoff.
+    Jobs whose lease expires (the worker died mid-write) become claimable
+    again. Each claim carries a fresh token, and only the holder of the
+    current token can complete or fail the job, so a worker that outlived
+    its lease cannot overwrite the outcome of the retry. An idempotency key
+    maps repeated submissions to the same job.
+    """
+
+    def __init__(self, state: SharedState):
+        self.state = state
+        self.max_attempts = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+        self.retry_base_delay = float(os.getenv("JOB_RETRY_BASE_DELAY", "2"))
+        self.lease_seconds = float(os.getenv("JOB_LEASE_SECONDS", "120"))
+        self._table_ready = False
+
+    def _ensure_table(self, conn):
+        if not self._table_ready:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT NOT NULL, idempotency_key TEXT UNIQUE, "
+                "payload TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+                "max_attempts INTEGER NOT NULL, next_run_at REAL NOT NULL, claimed_at REAL, "
+                "checkpoint TEXT, result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL, "
+                "claim_token TEXT, request_hash TEXT)"
+            )
+            self.state.add_columns(conn, "jobs", {"claim_token": "TEXT", "request_hash": "TEXT"})
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, next_run_at)")
+            self._table_ready = True
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], idempotency_key: Optional[str] = None,
+                max_attempts: Optional[int] = None) -> Dict[str, Any]:
+        """Persist a job; a known idempotency key returns the existing job instead
+
+        Raises IdempotencyConflict if the key was used for a different kind or payload.
+        """
+        now = time.time()
+        request_hash = _request_hash(kind, payload)
+        with self.state.connection() as conn:
+            self._ensure_table(conn)
+            conn.execute(
+                "INSERT OR IGNORE INTO jobs (id, kind, idempotency_key, payload, status, max_attempts, "
+                "next_run_at, created_at, updated_at, request_hash) VALUES (?, ?, ?, ?, 'pending', ?, ?, ?, ?, ?)",
+                (uuid.uuid4().hex, kind, idempotency_key, json.dumps(payload), max_attempts or self.max_attempts,
+                 now, now, now, request_hash)
+            )
+            if idempotency_key is not None:
+                row = conn.execute(
+                    f"SELECT {', '.join(_COLUMNS)}, request_hash FROM jobs WHERE idempotency_key = ?",
+                    (idempotency_key,)
+                ).fetchone()
+                # Jobs stored before hashes were kept are compared by kind and payload
+                stored_hash = row[-1] or _request_hash(row[1], json.loads(row[3]))
+                if stored_hash != request_hash:
+                    raise IdempotencyConflict(
+                        f"Idempotency-Key '{idempotency_key}' was already used for a different request"
+                    )
+                row = row[:-1]
+            else:
+                row = conn.execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE rowid = last_insert_rowid()"
+                ).fetchone()
+        return _row_to_job(row)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.state.connection() as conn:
+            self._ensure_table(conn)
+            row = conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _row_to_job(row) if row else None
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """Most recent jobs, optionally filtered by status"""
+        query = f"SELECT {', '.join(_COLUMNS)} FROM jobs"
+        params: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        with self.state.connection() as conn:
+            self._ensure_table(conn)
+            rows = conn.execute(query, params + (limit,)).fetchall()
+        return [_row_to_job(row) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        """Job counts by status"""
+        with self.state.connection() as conn:
+            self._ensure_table(conn)
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return dict(rows)
+
+    def claim(self, limit: int) -> List[Dict[str, Any]]:
+        """Atomically lease up to `limit` due jobs to the calling worker
+
+        Each job comes back with a `claimToken` to pass to complete()/fail().
+        """
+        now = time.time()
+        tokens = []
+        with self.state.connection() as conn:
+            self._ensure_table(conn)
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = conn.execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM jobs "
+                    "WHERE (status = 'pending' AND next_run_at <= ?) "
+                    "OR (status = 'running' AND claimed_at <= ?) "
+                    "ORDER BY next_run_at LIMIT ?",
+                    (now, now - self.lease_seconds, limit)
+                ).fetchall()
+                for row in rows:
+                    tokens.append(uuid.uuid4().hex)
+                    conn.execute(
+                        "UPDATE jobs SET status = 'running', claimed_at = ?, claim_token = ?, "
+                        "attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                        (now, tokens[-1], now, row[0])
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        jobs = [_row_to_job(row) for row in rows]
+        for job, token in zip(jobs, tokens):
+            job["status"] = "running"
+            job["attempts"] += 1
+            job["claimToken"] = token
+        return jobs
+
+    def checkpoint(self, job_id: str, data: Dict[str, Any]) -> None:
+        """Merge progress (e.g. a broadcast tx hash) into the job so a retry can resume"""
+        with self.state.connection() as conn:
+            self._ensure_table(conn)
+            row = conn.execute("SELECT checkpoint FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            checkpoint = json.loads(row[0]) if row and row[0] else {}
+            checkpoint.update(data)
+            conn.execute(
+                "UPDATE jobs SET checkpoint = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(checkpoint), time.time(), job_id)
+            )
+
+    def renew(self, job_id: str, claim_token: str) -> bool:
+        """Extend a running job's lease; False if the lease was already lost"""
+        now = time.time()
+        with self.state.connection() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET claimed_at = ?, updated_at = ? "
+                "WHERE id = ? AND claim_token = ? AND status = 'running'",
+                (now, now, job_id, claim_token)
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id: str, claim_token: str, result: Any) -> bool:
+        """Record success; False if the lease was lost and the job left untouched"""
+        with self.state.connection() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'succeeded', result = ?, error = NULL, claimed_at = NULL, "
+                "claim_token = NULL, updated_at = ? WHERE id = ? AND claim_token = ?",
+                (serialization.dumps(result).decode("utf-8"), time.time(), job_id, claim_token)
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id: str, claim_token: str, error: str) -> bool:
+        """Record a failed attempt; reschedule with backoff or give up after max_attempts
+
+        Returns False if the lease was lost and the job left untouched.
+        """
+        now = time.time()
+        with self.state.connection() as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM jobs WHERE id = ? AND claim_token = ?", (job_id, claim_token)
+            ).fetchone()
+            if row is None:
+                return False
+            attempts, max_attempts = row
+            if attempts >= max_attempts:
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, claimed_at = NULL, claim_token = NULL, "
+                    "updated_at = ? WHERE id = ? AND claim_token = ?",
+                    (error, now, job_id, claim_token)
+                )
+            else:
+                delay = self.retry_base_delay * 2 ** (attempts - 1)
+                cursor = conn.execute(
+                    "UPDATE jobs SET status = 'pending', error = ?, claimed_at = NULL, claim_token = NULL, "
+                    "next_run_at = ?, updated_at = ? WHERE id = ? AND claim_token = ?",
+                    (error, now + delay, now, job_id, claim_token)
+                )
+        return cursor.rowcount == 1
+
+
+class JobRunner:
+    """Drains a JobQueue with a bounded pool at a controlled rate
+
+    Jobs are claimed in batches, at most `concurrency` run at once, and they
+    are started no faster than `rate` per second. Handlers call the services' blocking peer CLI and web3 code, so
+    each job runs on its own event loop in a worker thread and the API's
+    loop stays responsive. While a handler runs, its lease is renewed every
+    third of JOB_LEASE_SECONDS, so a slow receipt wait is not mistaken for
+    a dead worker and run a second time.
+    """
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, JobHandler]):
+        self.queue = queue
+        self.handlers = handlers
+        self.concurrency = int(os.getenv("JOB_WORKERS", "4"))
+        self.rate = float(os.getenv("JOB_RATE_LIMIT", "5"))
+        self.batch_size = int(os.getenv("JOB_BATCH_SIZE", "10"))
+        self.poll_interval = float(os.getenv("JOB_POLL_INTERVAL", "0.5"))
+        self.max_poll_interval = float(os.getenv("JOB_MAX_POLL_INTERVAL", "30"))
+        self._task: Optional[asyncio.Task] = None
+        self._running: set = set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self) -> None:
+        """Stop claiming; jobs still running are retried elsewhere once their lease expires"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _loop(self) -> None:
+        interval = 1.0 / self.rate if self.rate > 0 else 0.0
+        backoff = self.poll_interval
+        while True:
+            free = self.concurrency - len(self._running)
+            try:
+                jobs = self.queue.claim(min(self.batch_size, free)) if free > 0 else []
+            except Exception as e:
+                # e.g. "database is locked"; the loop must outlive a bad poll
+                print(f"Warning: Could not claim jobs, retrying in {backoff:.1f}s: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, self.max_poll_interval)
+                continue
+            backoff = self.poll_interval
+            if not jobs:
+                await asyncio.sleep(self.poll_interval)
+                continue
+            for job in jobs:
+                task = asyncio.get_running_loop().create_task(self._execute(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+                if interval:
+                    await asyncio.sleep(interval)
+
+    async def run_once(self) -> int:
+        """Claim and run one batch to completion; returns how many jobs ran"""
+        jobs = self.queue.claim(self.batch_size)
+        await asyncio.gather(*(self._execute(job) for job in jobs))
+        return len(jobs)
+
+    async def _renew_lease(self, job: Dict[str, Any]) -> None:
+        interval = max(self.queue.lease_seconds / 3, 0.05)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not self.queue.renew(job["jobId"], job["claimToken"]):
+                    print(f"Warning: Job {job['jobId']} lost its lease while running")
+                    return
+            except Exception as e:
+                # Try again next interval; the lease is still valid until it runs out
+                print(f"Warning: Could not renew lease of job {job['jobId']}: {e}")
+
+    async def _execute(self, job: Dict[str, Any]) -> None:
+        handler = self.handlers.get(job["kind"])
+        heartbeat = asyncio.get_running_loop().create_task(self._renew_lease(job))
+        try:
+            if handler is None:
+                recorded = self.queue.fail(
+                    job["jobId"], job["claimToken"], f"No handler for job kind '{job['kind']}'"
+                )
+            else:
+                try:
+                    result = await asyncio.to_thread(asyncio.run, handler(job["payload"], job))
+                except Exception as e:
+                    recorded = self.queue.fail(job["jobId"], job["claimToken"], str(e))
+                else:
+                    recorded = self.queue.complete(job["jobId"], job["claimToken"], result)
+        except Exception as e:
+            # The lease runs out and the job is retried
+            print(f"Warning: Could not record outcome of job {job['jobId']}: {e}")
+            return
+        finally:
+            heartbeat.cancel()
+        if not recorded:
+            print(f"Warning: Job {job['jobId']} lost its lease; outcome left to the current claim")
@@ -0,0 +1,88 @@
+import json
+from typing import Any, List
+
+
+class IncompleteArrayError(ValueError):
+    """The input began a JSON array but ended before it was closed, or was corrupt inside it"""
+
+
+class JSONArrayStream:
+    """Incrementally decode the elements of a JSON array fed in chunks.
+
+    Only the element currently being received is kept in memory, so a
+    chaincode result of any size can be consumed with a bounded buffer.
+    A top-level value that is not an array is returned as a single element
+    once the stream is closed.
+    """
+
+    _WHITESPACE = " \t\n\r"
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._state = "start"
+
+    def feed(self, chunk: str) -> List[Any]:
+        """Add a chunk of text and return the elements completed by it"""
+        if self._state == "done":
+            return []
+        self._buffer += chunk
+        if self._state == "start":
+            stripped = self._buffer.lstrip(self._WHITESPACE)
+            if not stripped:
+                self._buffer = ""
+                return []
+            if stripped[0] != "[":
+                self._state = "scalar"
+                self._buffer = stripped
+                return []
+            self._buffer = stripped[1:]
+            self._state = "items"
+        if self._state == "items":
+            return self._drain(final=False)
+        return []
+
+    def close(self) -> List[Any]:
+        """Signal end of input and return any remaining elements"""
+        if self._state == "scalar":
+            value = json.loads(self._buffer)
+            self._buffer = ""
+            self._state = "done"
+            return [value]
+        if self._state == "items":
+            try:
+                items = self._drain(final=True)
+            except json.JSONDecodeError as e:
+                raise IncompleteArrayError(f"Malformed JSON array in stream: {e}") from e
+            if self._state != "done":
+                raise IncompleteArrayError("Unterminated JSON array in stream")
+            return items
+        return []
+
+    def _drain(self, final: bool) -> List[Any]:
+        items = []
+        buffer = self._buffer
+        pos = 0
+        length = len(buffer)
+        while True:
+            while pos < length and buffer[pos] in self._WHITESPACE + ",":
+                pos += 1
+            if pos >= length:
+                break
+            if buffer[pos] == "]":
+                self._state = "done"
+                pos = length
+                break
+            try:
+                value, end = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise
+                break
+            # A number running up to the end of the buffer may continue in the next chunk
+            if end == length and not final and isinstance(value, (int, float)):
+                break
+            items.append(value)
+            pos = end
+        self._buffer = buffer[pos:]
+        return items
@@ -0,0 +1,193 @@
+import os
+import time
+import random
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Peers of the three orgs in infrastructure/fabric
+DEFAULT_PEERS = "peer0.org1.example.com:7051,peer0.org2.example.com:9051,peer0.org3.example.com:11051"
+
+# Where the peer CLI finds the network's crypto material (see deployChaincode.sh)
+DEFAULT_CRYPTO_PATH = "/opt/gopath/src/github.com/hyperledger/fabric/peer/crypto"
+
+# Peer CLI output meaning the peer itself could not be reached, as opposed
+# to a chaincode error returned by a healthy peer
+_UNREACHABLE_MARKERS = (
+    "connection refused",
+    "failed to create new connection",
+    "error while dialing",
+    "context deadline exceeded",
+    "no such container",
+    "is not running",
+    "unavailable",
+)
+
+# Weight of the newest sample in a peer's latency average
+_LATENCY_ALPHA = 0.3
+
+
+class PeerUnavailable(Exception):
+    """Raised when a peer could not be reached; the request may be retried on another peer"""
+
+
+def is_unreachable(output: str) -> bool:
+    """Whether failed peer CLI output points at the peer rather than the chaincode"""
+    output = output.lower()
+    return any(marker in output for marker in _UNREACHABLE_MARKERS)
+
+
+class Peer:
+    """One endorsing peer and the health/latency feedback gathered for it"""
+
+    __slots__ = (
+        "address", "host", "org", "tls_root_cert",
+        "latency_ms", "in_flight", "requests", "failures", "cooldown_until"
+    )
+
+    def __init__(self, address: str, crypto_path: str = DEFAULT_CRYPTO_PATH):
+        self.address = address
+        self.host = address.rsplit(":", 1)[0]
+        # peer0.org1.example.com -> org1.example.com -> org1
+        domain = self.host.split(".", 1)[1] if "." in self.host else self.host
+        self.org = domain.split(".", 1)[0]
+        self.tls_root_cert = f"{crypto_path}/peerOrganizations/{domain}/peers/{self.host}/tls/ca.crt"
+        self.latency_ms: Optional[float] = None
+        self.in_flight = 0
+        self.requests = 0
+        self.failures = 0
+        self.cooldown_until = 0.0
+
+    @property
+    def container(self) -> str:
+        # docker-compose names each peer container after its host
+        return self.host
+
+    def healthy(self, now: float) -> bool:
+        return now >= self.cooldown_until
+
+    def score(self) -> float:
+        """Expected wait on this peer; unmeasured peers score 0 so they get tried"""
+        return (self.latency_ms or 0.0) * (self.in_flight + 1)
+
+
+class PeerRouter:
+    """Chooses Fabric peers for queries and invokes from health and latency feedback
+
+    Queries go to one healthy peer picked by "power of two choices": two
+    random healthy peers are compared and the one with the lower latency
+    average times in-flight requests wins, which spreads load without
+    herding onto a single fast peer. The remaining peers are returned as
+    fallbacks in score order. Invokes are endorsed by the best healthy peer
+    of each of `endorsement_count` orgs; the peer CLI sends the proposal to
+    all of them in parallel. A peer that cannot be reached is skipped for a
+    cooldown that doubles with each consecutive failure.
+    """
+
+    def __init__(self, addresses: Optional[List[str]] = None, endorsement_count: Optional[int] = None):
+        if addresses is None:
+            addresses = [a.strip() for a in os.getenv("FABRIC_PEERS", DEFAULT_PEERS).split(",") if a.strip()]
+        crypto_path = os.getenv("FABRIC_CRYPTO_PATH", DEFAULT_CRYPTO_PATH)
+        self.peers = [Peer(address, crypto_path) for address in addresses]
+        if not self.peers:
+            raise ValueError("FABRIC_PEERS must name at least one peer")
+        orgs = {peer.org for peer in self.peers}
+        if endorsement_count is None:
+            # The channel's endorsement policy is MAJORITY of the member orgs
+            endorsement_count = int(os.getenv("FABRIC_ENDORSEMENT_COUNT", str(len(orgs) // 2 + 1)))
+        self.endorsement_count = max(1, min(endorsement_count, len(orgs)))
+        self.cooldown = float(os.getenv("FABRIC_PEER_COOLDOWN", "5"))
+        self.max_cooldown = float(os.getenv("FABRIC_PEER_MAX_COOLDOWN", "60"))
+        # Job runner threads share the router with the API's event loop
+        self._lock = threading.Lock()
+
+    def candidates(self, peers: Optional[List[Peer]] = None) -> List[Peer]:
+        """Peers in the order a query should try them"""
+        peers = self.peers if peers is None else peers
+        now = time.time()
+        with self._lock:
+            healthy = [peer for peer in peers if peer.healthy(now)]
+            cooling = sorted((peer for peer in peers if not peer.healthy(now)), key=lambda p: p.cooldown_until)
+            if len(healthy) >= 2:
+                first, second = random.sample(healthy, 2)
+                choice = first if first.score() <= second.score() else second
+            elif healthy:
+                choice = healthy[0]
+            else:
+                # Everything is cooling down; try the peer that recovers soonest
+                return cooling
+            rest = sorted((peer for peer in healthy if peer is not choice), key=Peer.score)
+        return [choice, *rest, *cooling]
+
+    def endorsers(self, peers: Optional[List[Peer]] = None) -> List[Peer]:
+        """Best peer of each of the `endorsement_count` best-scoring orgs"""
+        best: Dict[str, Peer] = {}
+        for peer in self.candidates(peers):
+            best.setdefault(peer.org, peer)
+        # candidates() lists healthy peers first, so dict order keeps that ranking
+        return list(best.values())[:self.endorsement_count]
+
+    @contextmanager
+    def use(self, peer: Peer, measure: bool = True) -> Iterator[None]:
+        """Count a request against a peer and feed its outcome back
+
+        PeerUnavailable marks the peer failed; any other outcome, including
+        a chaincode error, shows the peer is up and records its latency.
+        """
+        self.acquire(peer)
+        started = time.perf_counter()
+        try:
+            yield
+        except PeerUnavailable:
+            self.record_failure(peer)
+            raise
+        except Exception:
+            self.record_success(peer, (time.perf_counter() - started) * 1000 if measure else None)
+            raise
+        else:
+            self.record_success(peer, (time.perf_counter() - started) * 1000 if measure else None)
+        finally:
+            self.release(peer)
+
+    def acquire(self, peer: Peer) -> None:
+        """Count a request as in flight on a peer; pair with release()"""
+        with self._lock:
+            peer.in_flight += 1
+            peer.requests += 1
+
+    def release(self, peer: Peer) -> None:
+        with self._lock:
+            peer.in_flight -= 1
+
+    def record_success(self, peer: Peer, latency_ms: Optional[float] = None) -> None:
+        with self._lock:
+            peer.failures = 0
+            peer.cooldown_until = 0.0
+            if latency_ms is not None:
+                peer.latency_ms = latency_ms if peer.latency_ms is None else (
+                    _LATENCY_ALPHA * latency_ms + (1 - _LATENCY_ALPHA) * peer.latency_ms
+                )
+
+    def record_failure(self, peer: Peer) -> None:
+        with self._lock:
+            peer.failures += 1
+            delay = min(self.cooldown * 2 ** (peer.failures - 1), self.max_cooldown)
+            peer.cooldown_until = time.time() + delay
+
+    def status(self) -> List[Dict[str, Any]]:
+        """Routing view of every configured peer"""
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "address": peer.address,
+                    "org": peer.org,
+                    "healthy": peer.healthy(now),
+                    "latencyMs": round(peer.latency_ms, 1) if peer.latency_ms is not None else None,
+                    "inFlight": peer.in_flight,
+                    "requests": peer.requests,
+                    "consecutiveFailures": peer.failures,
+                    "cooldownSeconds": max(0.0, round(peer.cooldown_until - now, 1)),
+                }
+                for peer in self.peers
+            ]
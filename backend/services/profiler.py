@@ -0,0 +1,81 @@
+import sys
+import time
+import threading
+from collections import Counter
+from typing import Any, Dict, Optional
+
+
+class SamplingProfiler:
+    """Statistical profiler that samples every thread's stack for a time window
+
+    A background thread reads sys._current_frames() at a fixed interval and
+    counts collapsed stacks ("outer;inner;leaf"), the input format for
+    flame graph tools. Overhead is bounded by the interval, so it can be
+    switched on in production for a short window.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stacks: Counter = Counter()
+        self._samples = 0
+        self._started_at: Optional[float] = None
+        self._ends_at: Optional[float] = None
+        self._interval = 0.005
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, interval_ms: float = 5.0) -> Dict[str, Any]:
+        """Begin sampling for `seconds`; raises if a window is already open"""
+        with self._lock:
+            if self.running:
+                raise RuntimeError("Profiling is already running")
+            self._stacks = Counter()
+            self._samples = 0
+            self._interval = max(interval_ms, 1.0) / 1000
+            self._started_at = time.time()
+            self._ends_at = self._started_at + seconds
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._sample_loop, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        return self.status()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _sample_loop(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.is_set() and time.time() < self._ends_at:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                    frame = frame.f_back
+                with self._lock:
+                    self._stacks[";".join(reversed(stack))] += 1
+            with self._lock:
+                self._samples += 1
+            self._stop.wait(self._interval)
+
+    def status(self, top: int = 50) -> Dict[str, Any]:
+        """Current or last profiling window with its most frequent stacks"""
+        with self._lock:
+            return {
+                "running": self.running,
+                "startedAt": self._started_at,
+                "endsAt": self._ends_at,
+                "intervalMs": self._interval * 1000,
+                "samples": self._samples,
+                "stacks": [
+                    {"stack": stack, "count": count}
+                    for stack, count in self._stacks.most_common(top)
+                ],
+            }
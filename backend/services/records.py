@@ -0,0 +1,54 @@
+from dataclasses import dataclass, fields
+from typing import Any, Dict, List, Optional
+
+# Field names mirror the chaincode's JSON documents so records serialize
+# straight to the wire format without a renaming pass.
+
+
+@dataclass(slots=True)
+class AssetRecord:
+    """An asset as stored by the asset chaincode"""
+    assetId: str
+    orgId: Optional[str] = None
+    metadata: Optional[str] = None
+    owner: Optional[str] = None
+    status: Optional[str] = None
+    timestamp: Optional[str] = None
+    lastUpdated: Optional[str] = None
+    history: Optional[List[Dict[str, Any]]] = None
+    transferHistory: Optional[List[Dict[str, Any]]] = None
+
+
+@dataclass(slots=True)
+class HistoryRecord:
+    """One entry of GetAssetHistory: a transaction that touched an asset"""
+    txId: str
+    timestamp: Any = None
+    isDelete: Optional[str] = None
+    value: Optional[str] = None
+
+
+def _known_fields(cls) -> frozenset:
+    return frozenset(f.name for f in fields(cls))
+
+
+_ASSET_FIELDS = _known_fields(AssetRecord)
+_HISTORY_FIELDS = _known_fields(HistoryRecord)
+
+
+def asset_from_chaincode(value: Any) -> Any:
+    """Build an AssetRecord from a decoded chaincode value
+
+    Values that are not asset documents (GetAllAssets passes through
+    non-JSON state as plain strings) are returned unchanged.
+    """
+    if isinstance(value, dict) and "assetId" in value:
+        return AssetRecord(**{k: v for k, v in value.items() if k in _ASSET_FIELDS})
+    return value
+
+
+def history_from_chaincode(value: Any) -> Any:
+    """Build a HistoryRecord from a decoded GetAssetHistory entry"""
+    if isinstance(value, dict) and "txId" in value:
+        return HistoryRecord(**{k: v for k, v in value.items() if k in _HISTORY_FIELDS})
+    return value
@@ -0,0 +1,39 @@
+import os
+import json
+import dataclasses
+from decimal import Decimal
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+
+# Opt-in: orjson is only used when requested and installed
+FAST_JSON_ENABLED = (
+    os.getenv("BACKEND_FAST_JSON", "false").lower() == "true" and orjson is not None
+)
+
+
+def _default(obj: Any) -> Any:
+    """Encode the types service results contain that JSON has no native form for"""
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if isinstance(obj, Decimal):
+        # Matches what FastAPI's jsonable_encoder produced for token amounts
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Serialize a response payload to UTF-8 JSON bytes"""
+    if FAST_JSON_ENABLED:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, default=_default, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(data: Any) -> Any:
+    """Parse JSON text or bytes"""
+    if FAST_JSON_ENABLED:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+
+def default_state_path() -> str:
+    """Resolve the shared store location from SHARED_STATE_PATH or a sqlite DATABASE_URL"""
+    path = os.getenv("SHARED_STATE_PATH")
+    if path:
+        return path
+    database_url = os.getenv("DATABASE_URL", "sqlite:///./supplychain.db")
+    if database_url.startswith("sqlite:///"):
+        return database_url[len("sqlite:///"):]
+    return "./supplychain.db"
+
+
+class SharedState:
+    """Small SQLite-backed store shared by all API worker processes
+
+    Holds short-lived cache entries and per-account nonce counters so that
+    several uvicorn workers on one host agree on them. Use ":memory:" for a
+    process-local store (tests, single-worker development).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_state_path()
+        # How long a nonce may stay reserved without reaching the node before it is reissued
+        self.nonce_gap_timeout = float(os.getenv("NONCE_GAP_TIMEOUT", "30"))
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _connection(self) -> sqlite3.Connection:
+        # Opened lazily so each worker process gets its own connection
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            if self.path != ":memory:":
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS kv ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS nonces ("
+                "address TEXT PRIMARY KEY, nonce INTEGER NOT NULL, chain_nonce INTEGER, gap_since REAL)"
+            )
+            self.add_columns(conn, "nonces", {"chain_nonce": "INTEGER", "gap_since": "REAL"})
+            self._conn = conn
+        return self._conn
+
+    @staticmethod
+    def add_columns(conn: sqlite3.Connection, table: str, columns: Dict[str, str]) -> None:
+        """Add columns missing from a table created by an older version"""
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for name, declaration in columns.items():
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {declaration}")
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow the store's connection for components that keep their own tables"""
+        with self._lock:
+            yield self._connection()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a cached value, or None if it is missing or expired"""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT value, expires_at FROM kv WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            return None
+        return json.loads(value)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a JSON-serializable value, optionally expiring after `ttl` seconds"""
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._connection().execute(
+                "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                (key, json.dumps(value), expires_at)
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._connection().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def next_nonce(self, address: str, chain_nonce: int) -> int:
+        """Reserve the next transaction nonce for an account across all workers
+
+        `chain_nonce` is the node's pending transaction count; the reserved
+        nonce is never lower than it, and never reused while reserved.
+
+        Reservations from `chain_nonce` up to the counter have not reached
+        the node yet. That is normal for a moment while they are signed and
+        sent, but if the node's count stays put for NONCE_GAP_TIMEOUT, the
+        lowest one was lost (its sender failed before broadcasting) and every
+        later transaction is stuck behind it. That nonce is then reissued to
+        fill the gap; the counter itself is not rewound, because the later
+        nonces are already queued at the node.
+        """
+        address = address.lower()
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(
+                    "SELECT nonce, chain_nonce, gap_since FROM nonces WHERE address = ?", (address,)
+                ).fetchone()
+                if row is None or chain_nonce > row[0]:
+                    # Nothing reserved beyond what the node has seen
+                    nonce = counter = chain_nonce
+                    gap_since = None
+                else:
+                    counter, seen_chain_nonce, gap_since = row
+                    if seen_chain_nonce != chain_nonce or gap_since is None:
+                        # The node moved (or a gap just opened); start timing it
+                        gap_since = now
+                        counter = nonce = counter + 1
+                    elif now - gap_since >= self.nonce_gap_timeout:
+                        nonce = chain_nonce
+                        gap_since = now
+                    else:
+                        counter = nonce = counter + 1
+                conn.execute(
+                    "INSERT INTO nonces (address, nonce, chain_nonce, gap_since) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(address) DO UPDATE SET nonce = excluded.nonce, "
+                    "chain_nonce = excluded.chain_nonce, gap_since = excluded.gap_since",
+                    (address, counter, chain_nonce, gap_since)
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        return nonce
+
+    def release_nonce(self, address: str, nonce: int) -> None:
+        """Give back a reserved nonce whose transaction was never broadcast"""
+        with self._lock:
+            self._connection().execute(
+                "UPDATE nonces SET nonce = nonce - 1 WHERE address = ? AND nonce = ?",
+                (address.lower(), nonce)
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,243 @@
+import os
+import re
+import time
+import tempfile
+from typing import Any, Dict, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow is optional; analytics endpoints report 503 without it
+    pa = None
+    pc = None
+    pq = None
+
+from services import serialization
+from services.records import AssetRecord
+
+# Metadata fields flattened into their own columns
+METADATA_FIELDS = ("name", "origin", "carbonFootprint", "certification")
+
+# Columns the footprint query may group by
+GROUPABLE_COLUMNS = ("origin", "certification", "owner", "orgId", "status", "name")
+
+# Fields that change whenever the chaincode writes an asset; equal values
+# mean the asset's history does not need to be fetched again
+_FINGERPRINT_FIELDS = ("status", "owner", "lastUpdated", "historyLength", "transferCount")
+
+# A number directly followed by its unit; the lookbehind skips digits inside
+# words, so the "2" of "CO2" is never read as an amount
+_FOOTPRINT_PATTERN = re.compile(r"(?<![\w.])([-+]?\d*\.?\d+)\s*(kg|g|t|tonnes?)\b", re.IGNORECASE)
+# A bare number is taken to be kilograms
+_BARE_NUMBER_PATTERN = re.compile(r"\s*([-+]?\d*\.?\d+)\s*")
+_UNIT_TO_KG = {"g": 0.001, "kg": 1.0, "t": 1000.0, "tonne": 1000.0, "tonnes": 1000.0}
+
+
+class SnapshotUnavailable(Exception):
+    """Raised when the analytics snapshot cannot be used (pyarrow missing, not built yet)"""
+
+
+def parse_footprint_kg(value: Any) -> Optional[float]:
+    """Turn a carbonFootprint like "2.5kg CO2" into kilograms"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    match = _FOOTPRINT_PATTERN.search(value)
+    if match:
+        return float(match.group(1)) * _UNIT_TO_KG.get(match.group(2).lower(), 1.0)
+    match = _BARE_NUMBER_PATTERN.fullmatch(value)
+    return float(match.group(1)) if match else None
+
+
+def _asset_row(asset: AssetRecord) -> Dict[str, Any]:
+    try:
+        metadata = serialization.loads(asset.metadata) if asset.metadata else {}
+    except ValueError:
+        metadata = {}
+    if not isinstance(metadata, dict):
+        metadata = {}
+    row = {
+        "assetId": asset.assetId,
+        "orgId": asset.orgId,
+        "owner": asset.owner,
+        "status": asset.status,
+        "timestamp": asset.timestamp,
+        "lastUpdated": asset.lastUpdated,
+        "historyLength": len(asset.history or []),
+        "transferCount": len(asset.transferHistory or []),
+        "metadata": asset.metadata,
+    }
+    for field in METADATA_FIELDS:
+        value = metadata.get(field)
+        row[field] = None if value is None else str(value)
+    row["carbonFootprintKg"] = parse_footprint_kg(metadata.get("carbonFootprint"))
+    return row
+
+
+def _history_timestamp(value: Any) -> Optional[int]:
+    """Fabric history timestamps arrive as {"seconds": ..., "nanos": ...}"""
+    if isinstance(value, dict):
+        seconds = value.get("seconds", value.get("low"))
+        return int(seconds) if seconds is not None else None
+    if isinstance(value, (int, float)):
+        return int(value)
+    return None
+
+
+def _schemas():
+    assets = pa.schema([
+        ("assetId", pa.string()), ("orgId", pa.string()), ("owner", pa.string()),
+        ("status", pa.string()), ("timestamp", pa.string()), ("lastUpdated", pa.string()),
+        ("historyLength", pa.int32()), ("transferCount", pa.int32()), ("metadata", pa.string()),
+        ("name", pa.string()), ("origin", pa.string()), ("carbonFootprint", pa.string()),
+        ("certification", pa.string()), ("carbonFootprintKg", pa.float64()),
+    ])
+    history = pa.schema([
+        ("assetId", pa.string()), ("txId", pa.string()), ("timestampSeconds", pa.int64()),
+        ("isDelete", pa.bool_()), ("value", pa.string()),
+    ])
+    return assets, history
+
+
+class AssetSnapshot:
+    """Parquet snapshot of Fabric assets and their histories for analytics
+
+    Metadata fields are flattened into columns and the ledger height the
+    snapshot reflects is stored in the file's schema metadata. Refreshing
+    is incremental: nothing is fetched if the height is unchanged, and only
+    assets whose state changed have their history re-read. Queries read the
+    files memory-mapped and aggregate with Arrow compute kernels.
+    """
+
+    def __init__(self, fabric_service, directory: Optional[str] = None):
+        self.fabric_service = fabric_service
+        self.directory = directory or os.getenv("SNAPSHOT_DIR", "./snapshots")
+        self.assets_path = os.path.join(self.directory, "assets.parquet")
+        self.history_path = os.path.join(self.directory, "asset_history.parquet")
+
+    def _require_pyarrow(self):
+        if pa is None:
+            raise SnapshotUnavailable("pyarrow is not installed; install it to use analytics snapshots")
+
+    def _read(self, path: str, columns: Optional[List[str]] = None):
+        return pq.read_table(path, columns=columns, memory_map=True)
+
+    def info(self) -> Dict[str, Any]:
+        """Ledger height, row counts and refresh time of the current snapshot"""
+        self._require_pyarrow()
+        if not os.path.exists(self.assets_path):
+            raise SnapshotUnavailable("No snapshot yet; refresh it first")
+        metadata = pq.read_metadata(self.assets_path)
+        extra = metadata.metadata or {}
+        return {
+            "ledgerHeight": int(extra.get(b"ledger_height", b"-1")),
+            "refreshedAt": float(extra.get(b"refreshed_at", b"0")),
+            "assets": metadata.num_rows,
+            "historyEntries": pq.read_metadata(self.history_path).num_rows
+            if os.path.exists(self.history_path) else 0,
+        }
+
+    async def refresh(self, force: bool = False) -> Dict[str, Any]:
+        """Bring the snapshot up to the current ledger height"""
+        self._require_pyarrow()
+        height = await self.fabric_service.get_ledger_height()
+        previous_assets = previous_history = None
+        if os.path.exists(self.assets_path) and not force:
+            if self.info()["ledgerHeight"] == height:
+                return {**self.info(), "changedAssets": 0}
+            previous_assets = self._read(self.assets_path, ["assetId", *_FINGERPRINT_FIELDS]).to_pylist()
+            previous_history = self._read(self.history_path) if os.path.exists(self.history_path) else None
+        fingerprints = {
+            row["assetId"]: tuple(row[field] for field in _FINGERPRINT_FIELDS)
+            for row in previous_assets or []
+        }
+
+        asset_rows: List[Dict[str, Any]] = []
+        changed: List[str] = []
+        async for asset in self.fabric_service.iter_all_assets():
+            if not isinstance(asset, AssetRecord):
+                continue
+            row = _asset_row(asset)
+            asset_rows.append(row)
+            if fingerprints.get(asset.assetId) != tuple(row[field] for field in _FINGERPRINT_FIELDS):
+                changed.append(asset.assetId)
+
+        history_rows: List[Dict[str, Any]] = []
+        for asset_id in changed:
+            async for entry in self.fabric_service.iter_asset_history(asset_id):
+                history_rows.append({
+                    "assetId": asset_id,
+                    "txId": getattr(entry, "txId", None),
+                    "timestampSeconds": _history_timestamp(getattr(entry, "timestamp", None)),
+                    "isDelete": str(getattr(entry, "isDelete", "false")).lower() == "true",
+                    "value": getattr(entry, "value", None),
+                })
+
+        assets_schema, history_schema = _schemas()
+        schema_metadata = {b"ledger_height": str(height).encode(), b"refreshed_at": str(time.time()).encode()}
+        assets_table = pa.Table.from_pylist(asset_rows, schema=assets_schema).replace_schema_metadata(schema_metadata)
+        history_table = pa.Table.from_pylist(history_rows, schema=history_schema)
+        if previous_history is not None:
+            # Keep history of unchanged, still-present assets from the old snapshot
+            current_ids = pa.array([row["assetId"] for row in asset_rows], pa.string())
+            keep = pc.and_(
+                pc.is_in(previous_history["assetId"], value_set=current_ids),
+                pc.invert(pc.is_in(previous_history["assetId"], value_set=pa.array(changed, pa.string())))
+            )
+            history_table = pa.concat_tables([previous_history.filter(keep).cast(history_schema), history_table])
+        history_table = history_table.replace_schema_metadata(schema_metadata)
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._write(assets_table, self.assets_path)
+        self._write(history_table, self.history_path)
+        return {**self.info(), "changedAssets": len(changed)}
+
+    @staticmethod
+    def _write(table, path: str):
+        # Write then rename so readers never see a half-written file. The
+        # temporary name is unique, so concurrent refreshes (other workers, an
+        # overlapping admin refresh) never rename each other's partial output.
+        directory, name = os.path.split(path)
+        with tempfile.NamedTemporaryFile(dir=directory or ".", prefix=f".{name}.", suffix=".tmp",
+                                         delete=False) as tmp:
+            tmp_path = tmp.name
+        try:
+            pq.write_table(table, tmp_path, compression="zstd")
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def footprint_by(self, group_by: str = "origin") -> Dict[str, Any]:
+        """Carbon footprint totals per group, computed with Arrow's group_by kernels"""
+        self._require_pyarrow()
+        if group_by not in GROUPABLE_COLUMNS:
+            raise ValueError(f"groupBy must be one of: {', '.join(GROUPABLE_COLUMNS)}")
+        if not os.path.exists(self.assets_path):
+            raise SnapshotUnavailable("No snapshot yet; refresh it first")
+        table = self._read(self.assets_path, [group_by, "carbonFootprintKg", "assetId"])
+        grouped = table.group_by(group_by).aggregate([
+            ("assetId", "count"),
+            ("carbonFootprintKg", "sum"),
+            ("carbonFootprintKg", "mean"),
+        ])
+        rows = sorted(
+            grouped.to_pylist(),
+            key=lambda row: row["carbonFootprintKg_sum"] or 0,
+            reverse=True
+        )
+        return {
+            "ledgerHeight": self.info()["ledgerHeight"],
+            "groupBy": group_by,
+            "groups": [
+                {
+                    group_by: row[group_by],
+                    "assets": row["assetId_count"],
+                    "totalCarbonFootprintKg": row["carbonFootprintKg_sum"],
+                    "averageCarbonFootprintKg": row["carbonFootprintKg_mean"],
+                }
+                for row in rows
+            ],
+        }
@@ -0,0 +1,179 @@
+import os
+import uuid
+import time
+import string
+from typing import Any, Dict, List, Optional
+
+from services.asset_index import AssetTokenIndex
+from services.job_queue import JobQueue
+from services.shared_state import SharedState
+
+# Batch records are kept for a day after they are submitted
+JOB_TTL = 24 * 60 * 60
+
+# Queue job kind that mints one asset; register tokenize_asset() under it
+JOB_KIND = "tokenize_asset"
+
+
+def validate_uri_template(template: str) -> None:
+    """Raise ValueError unless `template` is a format string whose only field is {assetId}"""
+    try:
+        fields = [field for _, field, _, _ in string.Formatter().parse(template) if field is not None]
+    except ValueError as e:
+        raise ValueError(f"Invalid metadata URI template: {e}")
+    if any(field != "assetId" for field in fields):
+        raise ValueError("Metadata URI template may only contain the {assetId} placeholder")
+    if not fields:
+        raise ValueError("Metadata URI template must contain the {assetId} placeholder")
+    try:
+        # Conversions and format specs are only checked when applied
+        template.format(assetId="ASSET")
+    except (ValueError, KeyError, IndexError, AttributeError) as e:
+        raise ValueError(f"Invalid metadata URI template: {e}")
+
+
+class TokenizationPipeline:
+    """Tokenize a batch of Fabric assets as ERC721 NFTs through the durable job queue
+
+    Each asset becomes one queued job, so the mints run in the job runner's
+    worker threads and survive a restart. A batch record in the shared store
+    lists those jobs; its status is read back from the queue. Each asset is
+    minted at most once: assets already in the index are skipped, the asset
+    is reserved in the index before its mint is sent, and the broadcast
+    transaction is checkpointed so a retry waits for it instead of minting
+    again.
+    """
+
+    def __init__(self, fabric_service, evm_service, index: AssetTokenIndex, state: SharedState,
+                 queue: JobQueue):
+        self.fabric_service = fabric_service
+        self.evm_service = evm_service
+        self.index = index
+        self.state = state
+        self.queue = queue
+        self.max_attempts = int(os.getenv("TOKENIZE_MAX_ATTEMPTS", "3"))
+        self.metadata_uri_template = os.getenv("TOKENIZE_METADATA_URI", "asset://{assetId}")
+        # Long enough for a broadcast mint to be mined or dropped
+        self.reservation_ttl = float(os.getenv("TOKENIZE_RESERVATION_TTL", "3600"))
+
+    def _batch_key(self, batch_id: str) -> str:
+        return f"tokenize:job:{batch_id}"
+
+    def submit(self, asset_ids: List[str], to_address: str,
+               metadata_uri_template: Optional[str] = None) -> Dict[str, Any]:
+        """Queue one mint job per asset and return the batch's initial status
+
+        Raises ValueError for a bad template before anything is queued.
+        """
+        batch_id = uuid.uuid4().hex
+        template = metadata_uri_template or self.metadata_uri_template
+        validate_uri_template(template)
+        items = {}
+        # Duplicate IDs in one request would otherwise race each other
+        for asset_id in dict.fromkeys(asset_ids):
+            job = self.queue.enqueue(JOB_KIND, {
+                "batchId": batch_id,
+                "assetId": asset_id,
+                "to": to_address,
+                "metadataUri": template.format(assetId=asset_id),
+            }, max_attempts=self.max_attempts)
+            items[asset_id] = job["jobId"]
+        batch = {
+            "jobId": batch_id,
+            "to": to_address,
+            "metadataUriTemplate": template,
+            "items": items,
+            "createdAt": time.time(),
+        }
+        self.state.set(self._batch_key(batch_id), batch, ttl=JOB_TTL)
+        return self.get_job(batch_id)
+
+    def get_job(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Batch progress, composed from the state of its queued jobs"""
+        batch = self.state.get(self._batch_key(batch_id))
+        if batch is None:
+            return None
+        items = {asset_id: self._item(self.queue.get(job_id)) for asset_id, job_id in batch["items"].items()}
+        completed = sum(1 for item in items.values() if item["status"] in ("minted", "skipped", "failed"))
+        failed = sum(1 for item in items.values() if item["status"] == "failed")
+        if completed < len(items):
+            status = "running"
+        else:
+            status = "completed" if failed == 0 else "completed_with_errors"
+        return {
+            "jobId": batch_id,
+            "status": status,
+            "to": batch["to"],
+            "metadataUriTemplate": batch["metadataUriTemplate"],
+            "total": len(items),
+            "completed": completed,
+            "items": items,
+            "createdAt": batch["createdAt"],
+        }
+
+    @staticmethod
+    def _item(job: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        if job is None:
+            return {"status": "failed", "error": "Queued job not found"}
+        item = {"queueJobId": job["jobId"], "attempts": job["attempts"]}
+        if job["status"] == "succeeded":
+            item.update(job["result"])
+        elif job["status"] == "failed":
+            item.update(status="failed", error=job["error"])
+        else:
+            item["status"] = job["status"]
+            if job["error"]:
+                item["error"] = job["error"]
+        return item
+
+    async def tokenize_asset(self, payload: Dict[str, Any], job: Dict[str, Any]) -> Dict[str, Any]:
+        """Job handler: mint the NFT for one asset unless it already has one"""
+        asset_id = payload["assetId"]
+        checkpoint = job["checkpoint"]
+        existing = self.index.by_asset(asset_id)
+        if existing is None and job["attempts"] > 1:
+            # An earlier attempt may have been mined without being recorded
+            await self.index.sync_from_evm(self.evm_service)
+            existing = self.index.by_asset(asset_id)
+        if existing:
+            minted_here = checkpoint.get("txHash") is not None and existing["txHash"] == checkpoint["txHash"]
+            return {"status": "minted" if minted_here else "skipped", "tokenId": existing["tokenId"]}
+
+        if checkpoint.get("txHash") is None:
+            try:
+                await self.fabric_service.read_asset(asset_id)
+            except Exception as e:
+                raise Exception(f"Asset not found on Fabric: {e}")
+
+        if not self.index.reserve(asset_id, job["jobId"], self.reservation_ttl):
+            raise Exception(f"Asset {asset_id} is already being tokenized by another request")
+        sent = checkpoint.get("txHash") is not None
+
+        def on_sent(tx_hash: str, nonce: int) -> None:
+            nonlocal sent
+            sent = True
+            self.queue.checkpoint(job["jobId"], {"txHash": tx_hash, "nonce": nonce})
+
+        try:
+            result = await self.evm_service.mint_erc721(
+                payload["to"], None, payload["metadataUri"],
+                resume_tx_hash=checkpoint.get("txHash"),
+                resume_nonce=checkpoint.get("nonce"),
+                on_sent=on_sent
+            )
+        except Exception:
+            # Keep the reservation while a broadcast mint may still be mined
+            if not sent and job["attempts"] >= job["maxAttempts"]:
+                self.index.release(asset_id, job["jobId"])
+            raise
+
+        if result.get("tokenId") is not None:
+            mapping = self.index.record(
+                asset_id, result["tokenId"], self.evm_service.nft_address,
+                result["txHash"], result["blockNumber"], source="tokenize"
+            )
+        else:
+            # Receipt had no decodable NFTMinted log; pick it up from the event scan
+            await self.index.sync_from_evm(self.evm_service)
+            mapping = self.index.by_asset(asset_id) or {"tokenId": None}
+        return {"status": "minted", "tokenId": mapping["tokenId"], "txHash": result["txHash"]}
@@ -0,0 +1,163 @@
+import os
+import time
+import random
+import logging
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("supplychain.tracing")
+
+
+class Span:
+    """One timed operation in a request's span tree"""
+
+    __slots__ = ("name", "attributes", "start", "end", "children", "error")
+
+    def __init__(self, name: str, attributes: Dict[str, Any]):
+        self.name = name
+        self.attributes = attributes
+        self.start = time.perf_counter()
+        self.end: Optional[float] = None
+        self.children: List["Span"] = []
+        self.error: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        end = self.end if self.end is not None else time.perf_counter()
+        return (end - self.start) * 1000
+
+    def to_dict(self, origin: Optional[float] = None) -> Dict[str, Any]:
+        origin = self.start if origin is None else origin
+        result = {
+            "name": self.name,
+            "startMs": round((self.start - origin) * 1000, 3),
+            "durationMs": round(self.duration_ms, 3),
+        }
+        if self.attributes:
+            result["attributes"] = self.attributes
+        if self.error:
+            result["error"] = self.error
+        if self.children:
+            result["children"] = [child.to_dict(origin) for child in self.children]
+        return result
+
+
+class TraceConfig:
+    """Runtime tracing settings; adjustable through the admin API"""
+
+    def __init__(self):
+        self.enabled = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+        self.sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+        self.slow_ms = float(os.getenv("TRACE_SLOW_MS", "1000"))
+
+
+config = TraceConfig()
+
+_current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+# Most recent slow traces, newest last
+_slow_traces: deque = deque(maxlen=int(os.getenv("TRACE_SLOW_BUFFER", "50")))
+_slow_lock = threading.Lock()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Time a block as a child of the current span
+
+    Outside a traced request this is a no-op, so instrumentation can stay
+    in hot paths. Works in sync and async code alike because the parent is
+    tracked in a context variable.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    current = Span(name, attributes)
+    parent.children.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+
+
+def start_span(name: str, **attributes: Any) -> Optional[Span]:
+    """Attach a child span without making it current
+
+    For work that is suspended between steps, such as an async generator
+    yielding to its consumer; close it with finish_span.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        return None
+    current = Span(name, attributes)
+    parent.children.append(current)
+    return current
+
+
+def finish_span(current: Optional[Span], error: Optional[str] = None, **attributes: Any) -> None:
+    if current is None or current.end is not None:
+        return
+    current.attributes.update(attributes)
+    current.error = error
+    current.end = time.perf_counter()
+
+
+def record_error(error: BaseException, **attributes: Any) -> None:
+    """Attach a swallowed exception to the trace as a zero-length span"""
+    parent = _current_span.get()
+    if parent is None:
+        return
+    marker = Span("error", attributes)
+    marker.end = marker.start
+    marker.error = f"{type(error).__name__}: {error}"
+    parent.children.append(marker)
+
+
+@contextmanager
+def trace_request(name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+    """Open a root span for a request if tracing is on and the request is sampled
+
+    When the request takes longer than TRACE_SLOW_MS its full span tree is
+    logged and kept for the slow-trace admin endpoint.
+    """
+    if not config.enabled or random.random() >= config.sample_rate:
+        yield None
+        return
+    root = Span(name, attributes)
+    token = _current_span.set(root)
+    try:
+        yield root
+    except BaseException as e:
+        root.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        root.end = time.perf_counter()
+        _current_span.reset(token)
+        if root.duration_ms >= config.slow_ms:
+            trace = root.to_dict()
+            trace["recordedAt"] = time.time()
+            with _slow_lock:
+                _slow_traces.append(trace)
+            logger.warning("Slow request %s took %.1f ms: %s", name, root.duration_ms, trace)
+
+
+def slow_traces(limit: int = 20) -> List[Dict[str, Any]]:
+    """Most recent slow traces recorded by this worker, newest first"""
+    with _slow_lock:
+        return list(reversed(_slow_traces))[:limit]
+
+
+def web3_middleware(make_request, w3):
+    """web3 middleware that wraps every JSON-RPC call in a span"""
+    def middleware(method, params):
+        with span(f"web3.{method}"):
+            return make_request(method, params)
+    return middleware
@@ -0,0 +1,4 @@
+import os
+
+# Keep the shared worker state in memory so tests never write a database file
+os.environ.setdefault("SHARED_STATE_PATH", ":memory:")
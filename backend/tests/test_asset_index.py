@@ -0,0 +1,153 @@
+import asyncio
+
+import pytest
+
+from services.asset_index import AssetTokenIndex
+from services.job_queue import JobQueue, JobRunner
+from services.shared_state import SharedState
+from services.tokenization import JOB_KIND, TokenizationPipeline
+
+
+class FakeEVM:
+    nft_address = "0xNFT"
+
+    def __init__(self, fail_first=0):
+        self.mints = []
+        self.fail_first = fail_first
+
+    async def get_block_number(self):
+        return len(self.mints)
+
+    async def get_nft_mints(self, from_block, to_block):
+        return [m for m in self.mints if from_block <= m["blockNumber"] <= to_block]
+
+    async def mint_erc721(self, to_address, token_id, metadata_uri, resume_tx_hash=None, resume_nonce=None,
+                          on_sent=None):
+        if resume_tx_hash:
+            mint = next(m for m in self.mints if m["txHash"] == resume_tx_hash)
+            return {"tokenId": mint["tokenId"], "txHash": mint["txHash"], "blockNumber": mint["blockNumber"]}
+        token_id = len(self.mints) + 1
+        self.mints.append({"tokenId": token_id, "tokenURI": metadata_uri, "to": to_address,
+                           "contract": self.nft_address, "blockNumber": token_id, "txHash": f"0x{token_id}"})
+        if on_sent is not None:
+            on_sent(f"0x{token_id}", token_id - 1)
+        if self.fail_first:
+            # Broadcast succeeded but the caller saw an error (e.g. receipt timeout)
+            self.fail_first -= 1
+            raise Exception("receipt timed out")
+        return {"tokenId": token_id, "txHash": f"0x{token_id}", "blockNumber": token_id}
+
+
+class FakeFabric:
+    async def read_asset(self, asset_id):
+        if asset_id == "MISSING":
+            raise Exception("Asset MISSING does not exist")
+        return {"assetId": asset_id}
+
+
+def test_lookups_in_both_directions_and_across_workers(tmp_path):
+    path = str(tmp_path / "state.db")
+    index = AssetTokenIndex(SharedState(path))
+    index.record("ASSET001", 7, contract="0xNFT")
+    assert index.by_asset("ASSET001")["tokenId"] == 7
+    assert index.by_token(7)["assetId"] == "ASSET001"
+    # First link wins for either side
+    assert index.record("ASSET002", 7)["assetId"] == "ASSET001"
+    other_worker = AssetTokenIndex(SharedState(path))
+    assert other_worker.by_token(7)["assetId"] == "ASSET001"
+    assert other_worker.by_asset("ASSET404") is None
+
+def test_asset_id_from_uri():
+    index = AssetTokenIndex(SharedState(":memory:"))
+    assert index.asset_id_from_uri("asset://ASSET001") == "ASSET001"
+    assert index.asset_id_from_uri("ipfs://Qm123?assetId=ASSET003") == "ASSET003"
+    assert index.asset_id_from_uri("https://example.com/meta?v=2&assetId=ASSET004#top") == "ASSET004"
+    assert index.asset_id_from_uri("ipfs://Qm123") is None
+    # Paths that merely look like assets are not asset references
+    assert index.asset_id_from_uri("https://cdn.example.com/x/assets/logo.png") is None
+    assert index.asset_id_from_uri("https://example.com/?assetIdx=1") is None
+
+def test_sync_from_evm_is_incremental():
+    index = AssetTokenIndex(SharedState(":memory:"))
+    evm = FakeEVM()
+    asyncio.run(evm.mint_erc721("0xabc", None, "asset://ASSET001"))
+    assert asyncio.run(index.sync_from_evm(evm)) == 1
+    asyncio.run(evm.mint_erc721("0xabc", None, "asset://ASSET002"))
+    assert asyncio.run(index.sync_from_evm(evm)) == 1
+    assert index.by_token(2)["assetId"] == "ASSET002"
+
+def _pipeline(tmp_path, monkeypatch, evm):
+    monkeypatch.setenv("JOB_RETRY_BASE_DELAY", "0")
+    state = SharedState(str(tmp_path / "state.db"))
+    index = AssetTokenIndex(state)
+    queue = JobQueue(state)
+    pipeline = TokenizationPipeline(FakeFabric(), evm, index, state, queue)
+    return pipeline, JobRunner(queue, {JOB_KIND: pipeline.tokenize_asset})
+
+def _drain(runner):
+    async def run():
+        while await runner.run_once():
+            pass
+    asyncio.run(run())
+
+def test_pipeline_skips_tokenized_assets_and_never_double_mints(tmp_path, monkeypatch):
+    evm = FakeEVM(fail_first=1)
+    pipeline, runner = _pipeline(tmp_path, monkeypatch, evm)
+    pipeline.index.record("ASSET001", 99)
+
+    job = pipeline.submit(["ASSET001", "ASSET002", "ASSET002", "MISSING"], "0xabc")
+    assert job["status"] == "running"
+    _drain(runner)
+
+    job = pipeline.get_job(job["jobId"])
+    assert job["status"] == "completed_with_errors"
+    assert job["total"] == job["completed"] == 3
+    assert job["items"]["ASSET001"]["status"] == "skipped"
+    assert job["items"]["ASSET001"]["tokenId"] == 99
+    assert job["items"]["ASSET002"]["status"] == "minted"
+    assert job["items"]["ASSET002"]["attempts"] == 2
+    assert job["items"]["MISSING"]["status"] == "failed"
+    # The failed-looking first attempt had landed, so no second mint was sent
+    assert len(evm.mints) == 1
+    assert pipeline.index.by_asset("ASSET002")["tokenId"] == 1
+
+def test_batch_status_survives_restart(tmp_path, monkeypatch):
+    pipeline, _ = _pipeline(tmp_path, monkeypatch, FakeEVM())
+    job = pipeline.submit(["ASSET001"], "0xabc")
+
+    # A new worker process sees the same batch and finishes its job
+    restarted, runner = _pipeline(tmp_path, monkeypatch, pipeline.evm_service)
+    assert restarted.get_job(job["jobId"])["status"] == "running"
+    _drain(runner)
+    assert restarted.get_job(job["jobId"])["status"] == "completed"
+
+def test_concurrent_batches_mint_an_asset_once(tmp_path, monkeypatch):
+    evm = FakeEVM()
+    pipeline, runner = _pipeline(tmp_path, monkeypatch, evm)
+    first = pipeline.submit(["ASSET001"], "0xabc")
+    second = pipeline.submit(["ASSET001"], "0xdef")
+    _drain(runner)
+
+    statuses = sorted(pipeline.get_job(job["jobId"])["items"]["ASSET001"]["status"] for job in (first, second))
+    assert statuses == ["minted", "skipped"]
+    assert len(evm.mints) == 1
+
+def test_reservation_blocks_other_owners_until_released_or_linked(tmp_path):
+    index = AssetTokenIndex(SharedState(str(tmp_path / "state.db")))
+    assert index.reserve("ASSET001", "job-1", ttl=60)
+    assert index.reserve("ASSET001", "job-1", ttl=60)
+    assert not index.reserve("ASSET001", "job-2", ttl=60)
+    index.release("ASSET001", "job-1")
+    assert index.reserve("ASSET001", "job-2", ttl=60)
+    index.record("ASSET001", 7)
+    assert not index.reserve("ASSET001", "job-2", ttl=60)
+    # An expired reservation does not block the asset
+    assert index.reserve("ASSET002", "job-1", ttl=0)
+    assert index.reserve("ASSET002", "job-2", ttl=60)
+
+def test_bad_template_is_rejected_before_anything_is_queued(tmp_path, monkeypatch):
+    pipeline, _ = _pipeline(tmp_path, monkeypatch, FakeEVM())
+    for template in ("asset://{assetId}/{foo}", "asset://{0}", "asset://{assetId", "asset://x", "{assetId:d}"):
+        with pytest.raises(ValueError):
+            pipeline.submit(["ASSET001"], "0xabc", template)
+    assert pipeline.queue.stats() == {}
@@ -0,0 +1,123 @@
+from types import SimpleNamespace
+
+import pytest
+from hexbytes import HexBytes
+from web3.exceptions import TransactionNotFound
+
+from services.evm_service import EVMService
+from services.shared_state import SharedState
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.payload
+
+
+class FakeSession:
+    def __init__(self):
+        self.requests = []
+
+    def post(self, url, json, timeout):
+        self.requests.append(json)
+        replies = [{"jsonrpc": "2.0", "id": call["id"], "result": hex(call["id"] * 10)} for call in json]
+        replies[-1] = {"jsonrpc": "2.0", "id": json[-1]["id"], "error": {"message": "execution reverted"}}
+        # Nodes may answer a batch out of order
+        return FakeResponse(list(reversed(replies)))
+
+
+def test_batch_eth_call_pins_block_and_matches_replies_by_id():
+    service = EVMService(state=SharedState(":memory:"))
+    service._session = FakeSession()
+    results = service._batch_eth_call("0xToken", ["0x01", "0x02", "0x03"], block_number=255)
+
+    assert len(service._session.requests) == 1
+    assert {call["params"][1] for call in service._session.requests[0]} == {"0xff"}
+    assert results[:2] == [0, 10]
+    assert isinstance(results[2], Exception)
+
+
+class FakeEth:
+    """Node that knows only the transactions in `pool` and has mined `mined` per account"""
+
+    gas_price = 1
+
+    def __init__(self, pool=(), mined=0):
+        self.pool = set(pool)
+        self.mined = mined
+        self.sent = []
+
+    def get_transaction(self, tx_hash):
+        if tx_hash not in self.pool:
+            raise TransactionNotFound(tx_hash)
+        return {"hash": tx_hash}
+
+    def get_transaction_count(self, address, block):
+        return self.mined + (len(self.sent) if block == "pending" else 0)
+
+    def send_raw_transaction(self, raw):
+        self.sent.append(raw)
+        return HexBytes(raw)
+
+    def wait_for_transaction_receipt(self, tx_hash):
+        return {"transactionHash": tx_hash, "status": 1}
+
+
+class FakeAccount:
+    address = "0xMinter"
+
+    def sign_transaction(self, tx):
+        return SimpleNamespace(rawTransaction=bytes([tx["nonce"]]))
+
+
+class FakeCall:
+    def build_transaction(self, tx):
+        return tx
+
+
+def _service(eth):
+    service = EVMService(state=SharedState(":memory:"))
+    service._w3 = SimpleNamespace(eth=eth)
+    return service
+
+
+def test_resume_waits_for_known_transaction():
+    eth = FakeEth(pool={"0xabc"})
+    receipt = _service(eth)._send_transaction(
+        FakeAccount(), FakeCall(), 100_000, resume_tx_hash="0xabc", resume_nonce=4
+    )
+    assert receipt["transactionHash"] == "0xabc"
+    assert eth.sent == []
+
+
+def test_resume_resends_dropped_transaction_with_same_nonce():
+    eth = FakeEth(mined=4)
+    sent = []
+    _service(eth)._send_transaction(
+        FakeAccount(), FakeCall(), 100_000, resume_tx_hash="0xabc", resume_nonce=4,
+        on_sent=lambda tx_hash, nonce: sent.append((tx_hash, nonce))
+    )
+    assert eth.sent == [bytes([4])]
+    assert sent == [("0x04", 4)]
+
+
+def test_resume_takes_fresh_nonce_once_dropped_nonce_is_mined_over():
+    eth = FakeEth(mined=6)
+    sent = []
+    _service(eth)._send_transaction(
+        FakeAccount(), FakeCall(), 100_000, resume_tx_hash="0xabc", resume_nonce=4,
+        on_sent=lambda tx_hash, nonce: sent.append(nonce)
+    )
+    assert sent == [6]
+
+
+def test_resume_without_nonce_does_not_resend():
+    eth = FakeEth()
+    with pytest.raises(Exception, match="nonce is unknown"):
+        _service(eth)._send_transaction(FakeAccount(), FakeCall(), 100_000, resume_tx_hash="0xabc")
+    assert eth.sent == []
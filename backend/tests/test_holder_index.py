@@ -0,0 +1,90 @@
+import asyncio
+
+from services.holder_index import TokenHolderIndex, ZERO_ADDRESS
+from services.shared_state import SharedState
+
+ALICE = "0x00000000000000000000000000000000000000a1"
+BOB = "0x00000000000000000000000000000000000000b2"
+ETHER = 10 ** 18
+
+
+TOKEN = "0x00000000000000000000000000000000000000c3"
+
+
+class FakeEVM:
+    def __init__(self, token_address=TOKEN):
+        self.token_address = token_address
+        self.transfers = []
+
+    def add(self, sender, receiver, value):
+        self.transfers.append({"from": sender, "to": receiver, "value": value,
+                               "blockNumber": len(self.transfers) + 1})
+
+    async def get_block_number(self):
+        return len(self.transfers)
+
+    async def get_erc20_transfers(self, from_block, to_block):
+        if not self.token_address:
+            return []
+        return [t for t in self.transfers if from_block <= t["blockNumber"] <= to_block]
+
+
+def test_holders_follow_mints_transfers_and_burns(monkeypatch):
+    monkeypatch.setenv("EVM_LOG_CHUNK_BLOCKS", "2")
+    index = TokenHolderIndex(SharedState(":memory:"))
+    evm = FakeEVM()
+    evm.add(ZERO_ADDRESS, ALICE, 5 * ETHER)
+    evm.add(ZERO_ADDRESS, BOB, 2 ** 200)
+    evm.add(ALICE, BOB, 2 * ETHER)
+    assert asyncio.run(index.sync(evm)) == 3
+
+    holders = index.holders(TOKEN)
+    assert [h["address"].lower() for h in holders] == [BOB, ALICE]
+    assert holders[1]["balance"] == "3"
+    assert index.synced_block(TOKEN) == 3
+
+    evm.add(ALICE, ZERO_ADDRESS, 3 * ETHER)
+    assert asyncio.run(index.sync(evm)) == 1
+    assert index.holder_count(TOKEN) == 1
+    assert index.holders(TOKEN, limit=1)[0]["address"].lower() == BOB
+
+def test_range_is_applied_once_across_workers(tmp_path):
+    path = str(tmp_path / "state.db")
+    worker_a, worker_b = TokenHolderIndex(SharedState(path)), TokenHolderIndex(SharedState(path))
+    evm = FakeEVM()
+    evm.add(ZERO_ADDRESS, ALICE, ETHER)
+    asyncio.run(worker_a.sync(evm))
+    assert not worker_b._apply(TOKEN, 0, 1, evm.transfers)
+    assert asyncio.run(worker_b.sync(evm)) == 0
+    assert worker_b.holders(TOKEN)[0]["balance"] == "1"
+
+def test_sync_waits_for_deployment_and_follows_redeploys():
+    index = TokenHolderIndex(SharedState(":memory:"))
+    evm = FakeEVM(token_address=None)
+    for _ in range(5):
+        evm.add(ZERO_ADDRESS, BOB, ETHER)
+    assert asyncio.run(index.sync(evm)) == 0
+    assert index.synced_block(None) is None
+
+    # Once deployed, the token's history is read from the first block
+    evm.token_address = TOKEN
+    assert asyncio.run(index.sync(evm)) == 5
+    assert index.holders(TOKEN)[0]["balance"] == "5"
+
+    # A redeployed token has its own table and cursor
+    evm.token_address = ALICE
+    assert asyncio.run(index.sync(evm)) == 5
+    assert index.holder_count(TOKEN) == index.holder_count(ALICE) == 1
+
+def test_chain_reset_behind_cursor_rebuilds_holders():
+    index = TokenHolderIndex(SharedState(":memory:"))
+    evm = FakeEVM()
+    evm.add(ZERO_ADDRESS, ALICE, ETHER)
+    evm.add(ZERO_ADDRESS, ALICE, ETHER)
+    asyncio.run(index.sync(evm))
+
+    # A fresh chain at the same deterministic address, shorter than our cursor
+    evm.transfers = []
+    evm.add(ZERO_ADDRESS, BOB, ETHER)
+    assert asyncio.run(index.sync(evm)) == 1
+    assert [h["address"].lower() for h in index.holders(TOKEN)] == [BOB]
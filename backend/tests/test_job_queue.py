@@ -0,0 +1,142 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from services.job_queue import IdempotencyConflict, JobQueue, JobRunner
+from services.shared_state import SharedState
+
+
+def _queue(tmp_path, monkeypatch, **env):
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return JobQueue(SharedState(str(tmp_path / "state.db")))
+
+def test_idempotency_key_returns_existing_job(tmp_path, monkeypatch):
+    queue = _queue(tmp_path, monkeypatch)
+    first = queue.enqueue("mint_erc20", {"to": "0xabc", "amount": "1"}, idempotency_key="k1")
+    second = queue.enqueue("mint_erc20", {"to": "0xabc", "amount": "1"}, idempotency_key="k1")
+    third = queue.enqueue("mint_erc20", {"to": "0xabc", "amount": "1"})
+    assert first["jobId"] == second["jobId"] != third["jobId"]
+    assert queue.stats() == {"pending": 2}
+
+def test_idempotency_key_reused_for_different_request_conflicts(tmp_path, monkeypatch):
+    queue = _queue(tmp_path, monkeypatch)
+    queue.enqueue("mint_erc20", {"to": "0xabc", "amount": "1"}, idempotency_key="k1")
+    # Key order does not make a payload different
+    assert queue.enqueue("mint_erc20", {"amount": "1", "to": "0xabc"}, idempotency_key="k1")
+    with pytest.raises(IdempotencyConflict):
+        queue.enqueue("mint_erc20", {"to": "0xabc", "amount": "2"}, idempotency_key="k1")
+    with pytest.raises(IdempotencyConflict):
+        queue.enqueue("mint_erc721", {"to": "0xabc", "amount": "1"}, idempotency_key="k1")
+    assert queue.stats() == {"pending": 1}
+
+def test_claims_are_exclusive_across_workers(tmp_path, monkeypatch):
+    queue = _queue(tmp_path, monkeypatch)
+    other_worker = JobQueue(SharedState(queue.state.path))
+    for i in range(3):
+        queue.enqueue("create_asset", {"assetId": f"A{i}"})
+    claimed = queue.claim(2) + other_worker.claim(5)
+    assert sorted(job["payload"]["assetId"] for job in claimed) == ["A0", "A1", "A2"]
+    assert queue.claim(5) == []
+
+def test_failures_back_off_then_give_up(tmp_path, monkeypatch):
+    queue = _queue(tmp_path, monkeypatch, JOB_MAX_ATTEMPTS="2", JOB_RETRY_BASE_DELAY="0")
+    job = queue.enqueue("transfer_asset", {"assetId": "A1", "newOwner": "Org2"})
+    claimed, = queue.claim(1)
+    assert queue.fail(job["jobId"], claimed["claimToken"], "timed out")
+    assert queue.get(job["jobId"])["status"] == "pending"
+    claimed, = queue.claim(1)
+    assert queue.fail(job["jobId"], claimed["claimToken"], "timed out again")
+    failed = queue.get(job["jobId"])
+    assert failed["status"] == "failed"
+    assert failed["attempts"] == 2
+    assert failed["error"] == "timed out again"
+
+def test_expired_lease_is_reclaimed(tmp_path, monkeypatch):
+    queue = _queue(tmp_path, monkeypatch, JOB_LEASE_SECONDS="0")
+    queue.enqueue("mint_erc721", {"to": "0xabc"})
+    assert len(queue.claim(1)) == 1
+    # The worker holding the job died; the lease has already run out
+    assert len(queue.claim(1)) == 1
+
+def test_runner_resumes_from_checkpoint(tmp_path, monkeypatch):
+    queue = _queue(tmp_path, monkeypatch, JOB_RETRY_BASE_DELAY="0")
+    sent = []
+
+    async def mint(payload, job):
+        if job["checkpoint"].get("txHash"):
+            return {"txHash": job["checkpoint"]["txHash"], "resumed": True}
+        sent.append(payload)
+        queue.checkpoint(job["jobId"], {"txHash": "0x01"})
+        raise Exception("receipt timed out")
+
+    runner = JobRunner(queue, {"mint_erc20": mint})
+    job = queue.enqueue("mint_erc20", {"to": "0xabc", "amount": "5"})
+    assert asyncio.run(runner.run_once()) == 1
+    assert queue.get(job["jobId"])["status"] == "pending"
+    assert asyncio.run(runner.run_once()) == 1
+    done = queue.get(job["jobId"])
+    assert done["status"] == "succeeded"
+    assert done["result"] == {"txHash": "0x01", "resumed": True}
+    assert len(sent) == 1
+
+def test_stale_worker_cannot_record_outcome(tmp_path, monkeypatch):
+    queue = _queue(tmp_path, monkeypatch, JOB_LEASE_SECONDS="0")
+    job = queue.enqueue("mint_erc721", {"to": "0xabc"})
+    stale, = queue.claim(1)
+    current, = queue.claim(1)
+    # The first worker finishes after its lease was handed on
+    assert not queue.complete(job["jobId"], stale["claimToken"], {"txHash": "0x01"})
+    assert not queue.fail(job["jobId"], stale["claimToken"], "timed out")
+    assert queue.get(job["jobId"])["status"] == "running"
+    assert queue.complete(job["jobId"], current["claimToken"], {"txHash": "0x02"})
+    assert queue.get(job["jobId"])["result"] == {"txHash": "0x02"}
+
+def test_runner_survives_claim_errors(tmp_path, monkeypatch):
+    queue = _queue(tmp_path, monkeypatch, JOB_POLL_INTERVAL="0.01", JOB_RATE_LIMIT="0")
+    job = queue.enqueue("create_asset", {"assetId": "A1"})
+    claim = queue.claim
+    failures = []
+
+    def flaky_claim(limit):
+        if len(failures) < 2:
+            failures.append(limit)
+            raise sqlite3.OperationalError("database is locked")
+        return claim(limit)
+
+    monkeypatch.setattr(queue, "claim", flaky_claim)
+
+    async def create(payload, job):
+        return {"assetId": payload["assetId"]}
+
+    async def run():
+        runner = JobRunner(queue, {"create_asset": create})
+        runner.start()
+        for _ in range(200):
+            if queue.get(job["jobId"])["status"] == "succeeded":
+                break
+            await asyncio.sleep(0.01)
+        await runner.stop()
+
+    asyncio.run(run())
+    assert len(failures) == 2
+    assert queue.get(job["jobId"])["status"] == "succeeded"
+
+def test_lease_is_renewed_while_handler_runs(tmp_path, monkeypatch):
+    queue = _queue(tmp_path, monkeypatch, JOB_LEASE_SECONDS="0.3")
+    other_worker = JobQueue(SharedState(queue.state.path))
+    job = queue.enqueue("mint_erc20", {"to": "0xabc", "amount": "1"})
+    reclaimed = []
+
+    async def slow_mint(payload, job):
+        # Longer than the lease, like a receipt wait on a busy node
+        for _ in range(4):
+            time.sleep(0.2)
+            reclaimed.extend(other_worker.claim(1))
+        return {"txHash": "0x01"}
+
+    asyncio.run(JobRunner(queue, {"mint_erc20": slow_mint}).run_once())
+    assert reclaimed == []
+    assert queue.get(job["jobId"])["status"] == "succeeded"
@@ -0,0 +1,65 @@
+import sys
+import asyncio
+
+import pytest
+from services.fabric_service import FabricService
+from services.json_stream import IncompleteArrayError, JSONArrayStream
+
+
+def _feed_all(chunks):
+    stream = JSONArrayStream()
+    items = []
+    for chunk in chunks:
+        items.extend(stream.feed(chunk))
+    items.extend(stream.close())
+    return items
+
+def test_array_split_across_chunks():
+    text = '[{"assetId": "A1", "metadata": "{\\"origin\\": \\"Sweden\\"}"}, {"assetId": "A2"}, 12, 345]'
+    chunks = [text[i:i + 3] for i in range(0, len(text), 3)]
+    assert _feed_all(chunks) == [
+        {"assetId": "A1", "metadata": '{"origin": "Sweden"}'},
+        {"assetId": "A2"},
+        12,
+        345,
+    ]
+
+def test_elements_released_as_soon_as_complete():
+    stream = JSONArrayStream()
+    assert stream.feed('[{"a": 1}, {"b"') == [{"a": 1}]
+    assert stream.feed(': 2}]') == [{"b": 2}]
+    assert stream.close() == []
+
+def test_non_array_and_empty_output():
+    assert _feed_all(['  {"assetId": ', '"A1"}\n']) == [{"assetId": "A1"}]
+    assert _feed_all(["", "  \n"]) == []
+
+def test_truncated_array_raises():
+    with pytest.raises(ValueError):
+        _feed_all(['[{"a": 1}, {"b": 2'])
+
+def test_truncation_is_distinguished_from_non_json_output():
+    with pytest.raises(IncompleteArrayError):
+        _feed_all(['[{"a": 1}, {"b": 2'])
+    with pytest.raises(IncompleteArrayError):
+        _feed_all(['[{"a": 1}, {"b": oops}]'])
+    # A scalar that is not JSON is a plain ValueError, not a truncated array
+    with pytest.raises(ValueError) as error:
+        _feed_all(["Error: not json"])
+    assert not isinstance(error.value, IncompleteArrayError)
+
+def _stream_output(monkeypatch, output):
+    fabric = FabricService()
+    peer = fabric.router.peers[0]
+    monkeypatch.setattr(fabric, "_running_containers", lambda: {peer.container})
+    monkeypatch.setattr(fabric, "_query_command", lambda *args: [sys.executable, "-c", f"print({output!r})"])
+
+    async def collect():
+        return [item async for item in fabric.iter_all_assets()]
+    return asyncio.run(collect())
+
+def test_fabric_stream_rejects_truncated_peer_output(monkeypatch):
+    assert len(_stream_output(monkeypatch, '[{"assetId": "A1"}, {"assetId": "A2"}]')) == 2
+    assert _stream_output(monkeypatch, "no assets yet") == []
+    with pytest.raises(Exception, match="incomplete output"):
+        _stream_output(monkeypatch, '[{"assetId": "A1"}, {"assetId": "A2"')
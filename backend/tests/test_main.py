@@ -1,3 +1,4 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
 from main import app
@@ -33,3 +34,141 @@ def test_get_asset():
     # Asset might not exist, so 404 is acceptable
     assert response.status_code in [200, 404]
 
+
+async def _fake_assets():
+    yield {"assetId": "ASSET001"}
+    yield {"assetId": "ASSET002"}
+
+def test_get_all_assets_streams_envelope(monkeypatch):
+    import main
+    monkeypatch.setattr(main.fabric_service, "iter_all_assets", _fake_assets)
+    response = client.get("/api/assets")
+    assert response.status_code == 200
+    assert response.json() == {
+        "success": True,
+        "data": [{"assetId": "ASSET001"}, {"assetId": "ASSET002"}],
+    }
+
+def test_get_all_assets_streams_ndjson(monkeypatch):
+    import main
+    monkeypatch.setattr(main.fabric_service, "iter_all_assets", _fake_assets)
+    response = client.get("/api/assets", headers={"Accept": "application/x-ndjson"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line) for line in response.text.splitlines()] == [
+        {"assetId": "ASSET001"},
+        {"assetId": "ASSET002"},
+    ]
+
+def test_get_all_assets_fabric_down(monkeypatch):
+    import main
+
+    async def _unavailable():
+        raise Exception("Fabric network is not running. Container 'peer0' not found.")
+        yield
+
+    monkeypatch.setattr(main.fabric_service, "iter_all_assets", _unavailable)
+    response = client.get("/api/assets")
+    assert response.status_code == 503
+
+def test_conditional_get_returns_304_without_fetching(monkeypatch):
+    import main
+
+    async def _height():
+        return 42
+
+    async def _must_not_run():
+        raise AssertionError("ledger should not be queried on a 304")
+        yield
+
+    monkeypatch.setattr(main.fabric_service, "get_ledger_height", _height)
+    monkeypatch.setattr(main.fabric_service, "iter_all_assets", _fake_assets)
+    first = client.get("/api/assets")
+    etag = first.headers["etag"]
+    assert etag.startswith('"42-')
+
+    monkeypatch.setattr(main.fabric_service, "iter_all_assets", _must_not_run)
+    second = client.get("/api/assets", headers={"If-None-Match": etag})
+    assert second.status_code == 304
+    assert second.headers["etag"] == etag
+
+def test_asset_token_index_lookups():
+    import main
+    main.asset_index.record("INDEXED001", 501, source="test")
+    assert client.get("/api/assets/INDEXED001/token").json()["data"]["tokenId"] == 501
+    assert client.get("/api/tokens/erc721/501/asset").json()["data"]["assetId"] == "INDEXED001"
+    assert client.get("/api/assets/UNKNOWN/token").status_code == 404
+
+def test_mint_refuses_already_tokenized_asset():
+    import main
+    main.asset_index.record("INDEXED002", 502, source="test")
+    response = client.post("/api/tokens/erc721/mint", json={
+        "to": "0x0000000000000000000000000000000000000001",
+        "metadataUri": "asset://INDEXED002"
+    })
+    assert response.status_code == 409
+
+def test_mint_checks_named_asset_exists_on_fabric(monkeypatch):
+    import main
+
+    async def _missing(asset_id):
+        raise Exception(f"asset {asset_id} does not exist")
+
+    monkeypatch.setattr(main.fabric_service, "read_asset", _missing)
+    body = {"to": "0x0000000000000000000000000000000000000001", "metadataUri": "asset://NOPE001"}
+    assert client.post("/api/tokens/erc721/mint", json=body).status_code == 404
+    # The failed check left no reservation behind
+    assert main.asset_index.reserve("NOPE001", "test", ttl=1)
+
+def test_queued_mint_is_acknowledged_once_per_idempotency_key():
+    headers = {"Idempotency-Key": "mint-test-1"}
+    body = {"to": "0x0000000000000000000000000000000000000001", "amount": "1"}
+    first = client.post("/api/tokens/erc20/mint?queued=true", json=body, headers=headers)
+    second = client.post("/api/tokens/erc20/mint?queued=true", json=body, headers=headers)
+    assert first.status_code == 202
+    assert first.json()["data"]["jobId"] == second.json()["data"]["jobId"]
+    job = client.get(f"/api/jobs/{first.json()['data']['jobId']}").json()["data"]
+    assert job["kind"] == "mint_erc20"
+
+    # Reusing the key for a different request is rejected, not answered with the old job
+    other = client.post("/api/tokens/erc20/mint?queued=true", json={**body, "amount": "2"}, headers=headers)
+    assert other.status_code == 422
+
+def test_admin_tracing_toggle_and_token(monkeypatch):
+    from services import tracing
+    monkeypatch.setattr(tracing.config, "enabled", False)
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    # Without a configured token the admin API stays closed
+    assert client.get("/api/admin/tracing").status_code == 403
+    assert client.get("/api/admin/tracing", headers={"X-Admin-Token": ""}).status_code == 403
+
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    assert client.post("/api/admin/tracing", json={"enabled": True}).status_code == 403
+    assert client.post(
+        "/api/admin/tracing", json={"enabled": True}, headers={"X-Admin-Token": "wrong"}
+    ).status_code == 403
+
+    response = client.post(
+        "/api/admin/tracing",
+        json={"enabled": True, "slowMs": 250},
+        headers={"X-Admin-Token": "secret"}
+    )
+    assert response.status_code == 200
+    assert response.json()["data"]["enabled"] is True
+    assert tracing.config.slow_ms == 250
+    assert client.post(
+        "/api/admin/tracing", json={"sampleRate": 2}, headers={"X-Admin-Token": "secret"}
+    ).status_code == 400
+
+def test_admin_profiling_rejects_bad_window(monkeypatch):
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    response = client.post("/api/admin/profiling", json={"seconds": 0}, headers={"X-Admin-Token": "secret"})
+    assert response.status_code == 400
+
+def test_tokenize_batch_rejects_bad_template():
+    response = client.post("/api/tokenize/batch", json={
+        "assetIds": ["ASSET001"],
+        "to": "0x0000000000000000000000000000000000000001",
+        "metadataUriTemplate": "asset://{assetId}/{foo}"
+    })
+    assert response.status_code == 400
@@ -0,0 +1,61 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+import middleware
+from middleware import CompressionMiddleware, negotiate_encoding, strip_encoding_suffix
+
+app = FastAPI()
+app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+@app.get("/small")
+async def small():
+    return {"ok": True}
+
+@app.get("/large")
+async def large():
+    return PlainTextResponse("x" * 1000, headers={"ETag": '"7-abc"'})
+
+@app.get("/stream")
+async def stream():
+    async def body():
+        for i in range(3):
+            yield f'{{"n": {i}}}\n'
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+client = TestClient(app)
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding("") is None
+    assert negotiate_encoding("gzip;q=0") is None
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    if middleware.zstandard is not None:
+        assert negotiate_encoding("gzip, zstd") == "zstd"
+        assert negotiate_encoding("zstd;q=0.1, gzip") == "gzip"
+
+def test_small_bodies_are_not_compressed():
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+def test_large_body_gzip_and_etag_suffix():
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == '"7-abc-gzip"'
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.text == "x" * 1000
+    assert strip_encoding_suffix(response.headers["etag"]) == '"7-abc"'
+
+def test_streaming_body_is_compressed_incrementally():
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text.splitlines() == ['{"n": 0}', '{"n": 1}', '{"n": 2}']
+
+def test_zstd_round_trip():
+    if middleware.zstandard is None:
+        pytest.skip("zstandard not installed")
+    response = client.get("/large", headers={"Accept-Encoding": "zstd"}, )
+    assert response.headers["content-encoding"] == "zstd"
+    raw = middleware.zstandard.ZstdDecompressor().decompressobj().decompress(response.content)
+    assert raw == b"x" * 1000
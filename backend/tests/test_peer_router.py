@@ -0,0 +1,270 @@
+import asyncio
+import subprocess
+import sys
+
+import pytest
+
+from services.fabric_service import FabricService
+from services.peer_router import Peer, PeerRouter, PeerUnavailable, is_unreachable
+
+PEERS = ["peer0.org1.example.com:7051", "peer0.org2.example.com:9051", "peer0.org3.example.com:11051"]
+
+
+def test_peer_is_parsed_from_address():
+    peer = Peer("peer0.org2.example.com:9051", crypto_path="/crypto")
+    assert peer.container == "peer0.org2.example.com"
+    assert peer.org == "org2"
+    assert peer.tls_root_cert == "/crypto/peerOrganizations/org2.example.com/peers/peer0.org2.example.com/tls/ca.crt"
+
+
+def test_endorsement_count_defaults_to_majority_of_orgs():
+    assert PeerRouter(PEERS).endorsement_count == 2
+    assert PeerRouter(PEERS[:1]).endorsement_count == 1
+    assert PeerRouter(PEERS, endorsement_count=10).endorsement_count == 3
+
+
+def test_power_of_two_choices_prefers_lower_score():
+    router = PeerRouter(PEERS[:2])
+    fast, slow = router.peers
+    router.record_success(fast, 10)
+    router.record_success(slow, 500)
+    for _ in range(20):
+        assert router.candidates()[0] is fast
+
+    # A busy fast peer loses to an idle slower one
+    fast.in_flight = 100
+    assert router.candidates()[0] is slow
+
+
+def test_failed_peer_cools_down_and_recovers():
+    router = PeerRouter(PEERS)
+    down = router.peers[0]
+    router.record_failure(down)
+    assert router.candidates()[-1] is down
+    assert down not in router.endorsers()
+
+    router.record_failure(down)
+    assert down.failures == 2
+    router.record_success(down, 5)
+    assert down.failures == 0
+    assert router.status()[0]["healthy"] is True
+
+
+def test_endorsers_are_one_peer_per_org():
+    router = PeerRouter(PEERS + ["peer1.org1.example.com:8051"])
+    endorsers = router.endorsers()
+    assert len(endorsers) == 2
+    assert len({peer.org for peer in endorsers}) == 2
+
+
+def test_use_records_outcome():
+    router = PeerRouter(PEERS[:1])
+    peer = router.peers[0]
+    with pytest.raises(PeerUnavailable):
+        with router.use(peer):
+            assert peer.in_flight == 1
+            raise PeerUnavailable("down")
+    assert peer.in_flight == 0
+    assert peer.failures == 1
+
+    # A chaincode error still proves the peer is up
+    with pytest.raises(ValueError):
+        with router.use(peer):
+            raise ValueError("asset not found")
+    assert peer.failures == 0
+    assert peer.latency_ms is not None
+
+
+def test_is_unreachable():
+    assert is_unreachable("Error: failed to create new connection: connection error")
+    assert not is_unreachable(
+        "Error: endorsement failure during query. response: status:500 message:\"asset X does not exist\""
+    )
+
+
+class FakeCLI:
+    """Stands in for FabricService._run_cli, answering per container"""
+
+    def __init__(self, responses):
+        self.responses = responses
+        self.calls = []
+
+    def __call__(self, cmd, timeout):
+        self.calls.append(cmd)
+        if cmd[:2] == ["docker", "ps"]:
+            return subprocess.CompletedProcess(cmd, 0, stdout="\n".join(self.responses), stderr="")
+        # docker exec [-e NAME=value]... <container> ...
+        args = cmd[2:]
+        while args[0] == "-e":
+            args = args[2:]
+        returncode, stdout, stderr = self.responses[args[0]]
+        return subprocess.CompletedProcess(cmd, returncode, stdout=stdout, stderr=stderr)
+
+
+@pytest.fixture
+def fabric(monkeypatch):
+    monkeypatch.setenv("FABRIC_PEERS", ",".join(PEERS))
+    return FabricService()
+
+
+def test_query_fails_over_to_reachable_peer(fabric, monkeypatch):
+    cli = FakeCLI({
+        "peer0.org1.example.com": (1, "", "Error: error while dialing: connection refused"),
+        "peer0.org2.example.com": (1, "", "Error: error while dialing: connection refused"),
+        "peer0.org3.example.com": (0, '{"assetId": "A1"}', ""),
+    })
+    monkeypatch.setattr(fabric, "_run_cli", cli)
+    # Rank the reachable peer last so both unreachable ones are tried first
+    for peer, latency in zip(fabric.router.peers, (1, 2, 100)):
+        fabric.router.record_success(peer, latency)
+
+    assert asyncio.run(fabric._query_chaincode("ReadAsset", "A1")) == {"assetId": "A1"}
+    status = {peer["org"]: peer for peer in fabric.router.status()}
+    assert status["org3"]["healthy"] is True
+    assert status["org1"]["healthy"] is False and status["org2"]["healthy"] is False
+
+
+def test_chaincode_error_is_not_retried(fabric, monkeypatch):
+    error = (1, "", "Error: endorsement failure during query. response: status:500 message:\"not found\"")
+    cli = FakeCLI({container.rsplit(":", 1)[0]: error for container in PEERS})
+    monkeypatch.setattr(fabric, "_run_cli", cli)
+
+    with pytest.raises(Exception, match="not found"):
+        asyncio.run(fabric._query_chaincode("ReadAsset", "A1"))
+    assert len([cmd for cmd in cli.calls if "query" in cmd]) == 1
+
+
+def test_invoke_targets_endorsement_set(fabric, monkeypatch):
+    cli = FakeCLI({
+        "peer0.org1.example.com": (0, "", ""),
+        "peer0.org2.example.com": (0, "", ""),
+    })
+    monkeypatch.setattr(fabric, "_run_cli", cli)
+
+    asyncio.run(fabric._invoke_chaincode("TransferAsset", "A1", "Org2"))
+    invoke = next(cmd for cmd in cli.calls if "invoke" in cmd)
+    addresses = [invoke[i + 1] for i, arg in enumerate(invoke) if arg == "--peerAddresses"]
+    # org3's container is not running, so only org1 and org2 can endorse
+    assert sorted(addresses) == ["peer0.org1.example.com:7051", "peer0.org2.example.com:9051"]
+    assert invoke.count("--tlsRootCertFiles") == 2
+
+
+def test_invoke_always_submits_as_configured_org(fabric, monkeypatch):
+    monkeypatch.setattr(fabric, "org_name", "Org2")
+    monkeypatch.setattr(fabric, "msp_id", "Org2MSP")
+    cli = FakeCLI({container.rsplit(":", 1)[0]: (0, "", "") for container in PEERS})
+    monkeypatch.setattr(fabric, "_run_cli", cli)
+    # However the router ranks the peers, org2's peer submits
+    fabric.router.record_success(fabric.router.peers[0], 1)
+    fabric.router.record_success(fabric.router.peers[1], 900)
+
+    for _ in range(5):
+        asyncio.run(fabric._invoke_chaincode("TransferAsset", "A1", "Org3"))
+    invokes = [cmd for cmd in cli.calls if "invoke" in cmd]
+    assert all(cmd[2:5] == ["-e", "CORE_PEER_LOCALMSPID=Org2MSP", "peer0.org2.example.com"] for cmd in invokes)
+
+
+def test_invoke_without_own_org_peer_reports_network_down(fabric, monkeypatch):
+    monkeypatch.setattr(fabric, "_run_cli", FakeCLI({"peer0.org2.example.com": (0, "", "")}))
+    with pytest.raises(Exception, match="Fabric network is not running"):
+        asyncio.run(fabric._invoke_chaincode("TransferAsset", "A1", "Org3"))
+
+
+def test_no_running_peer_reports_network_down(fabric, monkeypatch):
+    monkeypatch.setattr(fabric, "_run_cli", FakeCLI({}))
+    with pytest.raises(Exception, match="Fabric network is not running"):
+        asyncio.run(fabric._query_chaincode("GetAllAssets"))
+
+
+def test_ledger_height_is_lowest_reachable_peer(fabric, monkeypatch):
+    heights = {"peer0.org1.example.com": 12, "peer0.org2.example.com": 11}
+
+    async def read_height(peer):
+        if peer.container not in heights:
+            raise PeerUnavailable("connection refused")
+        return heights[peer.container]
+
+    monkeypatch.setattr(fabric, "_read_ledger_height", read_height)
+    # A lagging peer may serve the body, so the ETag height must not be ahead of it
+    assert asyncio.run(fabric.get_ledger_height()) == 11
+
+
+def test_ledger_height_timeout_reaps_process(fabric, monkeypatch):
+    class HungProcess:
+        returncode = None
+        waited = False
+
+        async def communicate(self):
+            await asyncio.sleep(60)
+
+        def kill(self):
+            self.returncode = -9
+
+        async def wait(self):
+            self.waited = True
+            return self.returncode
+
+    process = HungProcess()
+
+    async def spawn(*cmd, **kwargs):
+        return process
+
+    async def no_wait(awaitable, timeout):
+        awaitable.close()
+        raise asyncio.TimeoutError
+
+    monkeypatch.setattr(asyncio, "create_subprocess_exec", spawn)
+    monkeypatch.setattr(asyncio, "wait_for", no_wait)
+    with pytest.raises(PeerUnavailable, match="timed out"):
+        asyncio.run(fabric._read_ledger_height(fabric.router.peers[0]))
+    assert process.waited
+
+
+def test_invoke_waits_for_commit_and_drops_cached_height(fabric, monkeypatch):
+    cli = FakeCLI({container.rsplit(":", 1)[0]: (0, "", "") for container in PEERS})
+    monkeypatch.setattr(fabric, "_run_cli", cli)
+    fabric.state.set(fabric._ledger_height_key, 41)
+
+    asyncio.run(fabric._invoke_chaincode("TransferAsset", "A1", "Org2"))
+    assert "--waitForEvent" in next(cmd for cmd in cli.calls if "invoke" in cmd)
+    assert fabric.state.get(fabric._ledger_height_key) is None
+
+
+def test_health_check_records_swallowed_errors(fabric, monkeypatch):
+    from services import tracing
+
+    def no_docker(cmd, timeout):
+        raise FileNotFoundError("docker")
+
+    monkeypatch.setattr(tracing.config, "enabled", True)
+    monkeypatch.setattr(fabric, "_run_cli", no_docker)
+    with tracing.trace_request("health") as root:
+        health = asyncio.run(fabric.check_network_health())
+    assert health["errors"] == ["Docker is not installed or not in PATH"]
+    assert root.children[0].error == "FileNotFoundError: docker"
+
+
+def test_stream_query_survives_chatty_stderr(fabric, monkeypatch):
+    # More stderr than a pipe buffer holds, written before any stdout
+    script = (
+        "import sys; sys.stderr.write('log line\\n' * 200000); sys.stderr.flush(); "
+        "sys.stdout.write('[{\"assetId\": \"A1\"}, {\"assetId\": \"A2\"}]')"
+    )
+    monkeypatch.setattr(fabric, "_query_command", lambda peer, *args: [sys.executable, "-c", script])
+
+    async def collect():
+        return [item async for item in fabric._stream_query_peer(fabric.router.peers[0], "GetAllAssets")]
+
+    assert asyncio.run(asyncio.wait_for(collect(), timeout=10)) == [{"assetId": "A1"}, {"assetId": "A2"}]
+
+
+def test_stream_query_reports_tail_of_stderr(fabric, monkeypatch):
+    script = "import sys; sys.stderr.write('x' * 100000 + 'asset A9 does not exist'); sys.exit(1)"
+    monkeypatch.setattr(fabric, "_query_command", lambda peer, *args: [sys.executable, "-c", script])
+
+    async def collect():
+        return [item async for item in fabric._stream_query_peer(fabric.router.peers[0], "ReadAsset", "A9")]
+
+    with pytest.raises(Exception, match="does not exist") as error:
+        asyncio.run(collect())
+    assert len(str(error.value)) < 20000
@@ -0,0 +1,30 @@
+from decimal import Decimal
+
+import json
+import pytest
+from services import serialization
+from services.records import AssetRecord, HistoryRecord, asset_from_chaincode, history_from_chaincode
+
+
+def test_asset_from_chaincode_builds_record():
+    record = asset_from_chaincode({"assetId": "ASSET001", "owner": "Org1", "unknown": 1})
+    assert record == AssetRecord(assetId="ASSET001", owner="Org1")
+    assert not hasattr(record, "__dict__")
+    # Non-document state is passed through untouched
+    assert asset_from_chaincode("not-json") == "not-json"
+
+def test_history_from_chaincode_builds_record():
+    entry = history_from_chaincode({"txId": "tx1", "isDelete": "false", "value": "{}"})
+    assert entry == HistoryRecord(txId="tx1", isDelete="false", value="{}")
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_dumps_records_and_decimals(monkeypatch, fast):
+    if fast and serialization.orjson is None:
+        pytest.skip("orjson not installed")
+    monkeypatch.setattr(serialization, "FAST_JSON_ENABLED", fast)
+    payload = {"data": [AssetRecord(assetId="A1", owner="Org2")], "balance": Decimal("1.5")}
+    decoded = json.loads(serialization.dumps(payload))
+    assert decoded["data"][0]["assetId"] == "A1"
+    assert decoded["data"][0]["owner"] == "Org2"
+    assert decoded["balance"] == 1.5
+    assert serialization.loads(b'{"a": [1]}') == {"a": [1]}
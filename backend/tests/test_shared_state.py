@@ -0,0 +1,72 @@
+import sqlite3
+
+from services import shared_state
+from services.shared_state import SharedState
+
+
+def test_nonces_are_unique_across_workers(tmp_path):
+    path = str(tmp_path / "state.db")
+    worker_a, worker_b = SharedState(path), SharedState(path)
+    assert worker_a.next_nonce("0xABC", chain_nonce=5) == 5
+    assert worker_b.next_nonce("0xabc", chain_nonce=5) == 6
+    assert worker_a.next_nonce("0xabc", chain_nonce=5) == 7
+    # The node catching up past our counter wins
+    assert worker_b.next_nonce("0xabc", chain_nonce=10) == 10
+
+def test_release_nonce_only_rewinds_latest(tmp_path):
+    state = SharedState(str(tmp_path / "state.db"))
+    state.next_nonce("0xabc", chain_nonce=0)
+    state.next_nonce("0xabc", chain_nonce=0)
+    state.release_nonce("0xabc", 0)
+    assert state.next_nonce("0xabc", chain_nonce=0) == 2
+    state.release_nonce("0xabc", 2)
+    assert state.next_nonce("0xabc", chain_nonce=0) == 2
+
+def test_lost_reservation_is_reissued_after_gap_timeout(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(shared_state.time, "time", lambda: clock[0])
+    monkeypatch.setenv("NONCE_GAP_TIMEOUT", "30")
+    path = str(tmp_path / "state.db")
+    worker_a, worker_b = SharedState(path), SharedState(path)
+    # A reserves 5 and dies before broadcasting; B's 6 sits behind the gap
+    assert worker_a.next_nonce("0xabc", chain_nonce=5) == 5
+    assert worker_b.next_nonce("0xabc", chain_nonce=5) == 6
+    worker_a.release_nonce("0xabc", 5)  # not the latest, so nothing is rewound
+    clock[0] += 10
+    assert worker_b.next_nonce("0xabc", chain_nonce=5) == 7
+
+    # The node's count has not moved for the timeout: 5 was lost, reissue it
+    clock[0] += 30
+    assert worker_a.next_nonce("0xabc", chain_nonce=5) == 5
+    # 6 and 7 are still queued at the node, so the counter carries on past them
+    assert worker_b.next_nonce("0xabc", chain_nonce=5) == 8
+    # Filling the gap releases the queued transactions
+    assert worker_a.next_nonce("0xabc", chain_nonce=9) == 9
+
+def test_in_flight_reservations_are_not_reissued(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(shared_state.time, "time", lambda: clock[0])
+    state = SharedState(str(tmp_path / "state.db"))
+    assert state.next_nonce("0xabc", chain_nonce=0) == 0
+    for expected in range(1, 5):
+        # The node keeps catching up, so the outstanding gap is never stale
+        clock[0] += 60
+        assert state.next_nonce("0xabc", chain_nonce=expected - 1) == expected
+
+def test_nonce_table_from_older_version_is_migrated(tmp_path):
+    path = str(tmp_path / "state.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE nonces (address TEXT PRIMARY KEY, nonce INTEGER NOT NULL)")
+    conn.execute("INSERT INTO nonces VALUES ('0xabc', 4)")
+    conn.commit()
+    conn.close()
+    assert SharedState(path).next_nonce("0xabc", chain_nonce=3) == 5
+
+def test_cache_entries_expire():
+    state = SharedState(":memory:")
+    state.set("fabric:supplychain:height", 12, ttl=60)
+    assert state.get("fabric:supplychain:height") == 12
+    state.set("evm:block_number", 3, ttl=-1)
+    assert state.get("evm:block_number") is None
+    state.delete("fabric:supplychain:height")
+    assert state.get("fabric:supplychain:height") is None
@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from services.records import AssetRecord, HistoryRecord
+from services.snapshot import AssetSnapshot, parse_footprint_kg
+
+
+def _asset(asset_id, origin, footprint, owner="Org1", last_updated=None):
+    metadata = json.dumps({"name": asset_id, "origin": origin, "carbonFootprint": footprint})
+    return AssetRecord(assetId=asset_id, orgId="Org1", owner=owner, status="CREATED",
+                       metadata=metadata, lastUpdated=last_updated)
+
+
+class FakeFabric:
+    def __init__(self):
+        self.height = 5
+        self.assets = [
+            _asset("A1", "Colombia", "2.5kg CO2"),
+            _asset("A2", "Sweden", "1.2kg CO2"),
+            _asset("A3", "Colombia", "0.5t CO2"),
+        ]
+        self.history_calls = []
+
+    async def get_ledger_height(self):
+        return self.height
+
+    async def iter_all_assets(self):
+        for asset in self.assets:
+            yield asset
+
+    async def iter_asset_history(self, asset_id):
+        self.history_calls.append(asset_id)
+        yield HistoryRecord(txId=f"tx-{asset_id}-{self.height}", timestamp={"seconds": 100, "nanos": 0},
+                            isDelete="false", value="{}")
+
+
+def test_parse_footprint_kg():
+    assert parse_footprint_kg("2.5kg CO2") == 2.5
+    assert parse_footprint_kg("0.5t CO2") == 500.0
+    assert parse_footprint_kg("n/a") is None
+    # The "2" of CO2 is not an amount
+    assert parse_footprint_kg("CO2: 3kg") == 3.0
+    assert parse_footprint_kg("CO2e 1.5 tonnes") == 1500.0
+    assert parse_footprint_kg("12.5") == 12.5
+    assert parse_footprint_kg("CO2") is None
+
+def test_footprint_by_origin(tmp_path):
+    snapshot = AssetSnapshot(FakeFabric(), directory=str(tmp_path))
+    asyncio.run(snapshot.refresh())
+    result = snapshot.footprint_by("origin")
+    assert result["ledgerHeight"] == 5
+    assert result["groups"][0] == {
+        "origin": "Colombia", "assets": 2,
+        "totalCarbonFootprintKg": 502.5, "averageCarbonFootprintKg": 251.25,
+    }
+    with pytest.raises(ValueError):
+        snapshot.footprint_by("metadata")
+
+def test_refresh_is_incremental(tmp_path):
+    fabric = FakeFabric()
+    snapshot = AssetSnapshot(fabric, directory=str(tmp_path))
+    assert asyncio.run(snapshot.refresh())["changedAssets"] == 3
+
+    fabric.history_calls.clear()
+    assert asyncio.run(snapshot.refresh())["changedAssets"] == 0
+    assert fabric.history_calls == []
+
+    fabric.height = 6
+    fabric.assets[1] = _asset("A2", "Sweden", "1.2kg CO2", owner="Org2", last_updated="later")
+    info = asyncio.run(snapshot.refresh())
+    assert info["changedAssets"] == 1
+    assert fabric.history_calls == ["A2"]
+    assert info["ledgerHeight"] == 6
+    assert info["historyEntries"] == 3
+
+def test_concurrent_writes_use_their_own_temp_files(tmp_path, monkeypatch):
+    from services import snapshot as snapshot_module
+    written = []
+    write_table = snapshot_module.pq.write_table
+
+    def record_write(table, where, **kwargs):
+        written.append(where)
+        write_table(table, where, **kwargs)
+
+    monkeypatch.setattr(snapshot_module.pq, "write_table", record_write)
+    snapshot = AssetSnapshot(FakeFabric(), directory=str(tmp_path))
+    asyncio.run(snapshot.refresh())
+    asyncio.run(snapshot.refresh())
+    assert len(set(written)) == len(written)
+    assert not list(tmp_path.glob("*.tmp"))
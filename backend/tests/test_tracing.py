@@ -0,0 +1,123 @@
+import time
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from middleware import TracingMiddleware
+from services import tracing
+from services.profiler import SamplingProfiler
+
+app = FastAPI()
+app.add_middleware(TracingMiddleware)
+
+@app.get("/work")
+async def work():
+    with tracing.span("outer", step=1):
+        with tracing.span("inner"):
+            pass
+    return {"ok": True}
+
+@app.get("/stream")
+async def stream():
+    async def body():
+        for i in range(2):
+            with tracing.span("chunk", n=i):
+                await asyncio.sleep(0.01)
+            yield f"{i}\n"
+    return StreamingResponse(body(), media_type="text/plain")
+
+@app.get("/swallowed")
+async def swallowed():
+    try:
+        raise ValueError("bad log")
+    except ValueError as e:
+        tracing.record_error(e, blockNumber=7)
+    return {"ok": True}
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def tracing_on(monkeypatch):
+    monkeypatch.setattr(tracing.config, "enabled", True)
+    monkeypatch.setattr(tracing.config, "sample_rate", 1.0)
+    monkeypatch.setattr(tracing.config, "slow_ms", 0.0)
+    tracing._slow_traces.clear()
+    yield
+    tracing._slow_traces.clear()
+
+
+def test_span_is_noop_without_root_span():
+    with tracing.span("orphan") as current:
+        assert current is None
+
+
+def test_disabled_tracing_records_nothing(monkeypatch):
+    monkeypatch.setattr(tracing.config, "enabled", False)
+    tracing._slow_traces.clear()
+    client.get("/work")
+    assert tracing.slow_traces() == []
+
+
+def test_slow_request_keeps_span_tree(tracing_on):
+    response = client.get("/work")
+    assert response.status_code == 200
+
+    trace = tracing.slow_traces()[0]
+    assert trace["name"] == "GET /work"
+    assert trace["attributes"]["status"] == 200
+    outer = trace["children"][0]
+    assert outer["name"] == "outer"
+    assert outer["attributes"] == {"step": 1}
+    assert outer["children"][0]["name"] == "inner"
+
+
+def test_trace_covers_streamed_body(tracing_on):
+    client.get("/stream")
+    trace = tracing.slow_traces()[0]
+    assert [child["name"] for child in trace["children"]] == ["chunk", "chunk"]
+    assert trace["durationMs"] >= 20
+
+
+def test_fast_requests_are_not_kept(tracing_on, monkeypatch):
+    monkeypatch.setattr(tracing.config, "slow_ms", 60_000.0)
+    client.get("/work")
+    assert tracing.slow_traces() == []
+
+
+def test_record_error_attaches_swallowed_exception(tracing_on):
+    client.get("/swallowed")
+    marker = tracing.slow_traces()[0]["children"][0]
+    assert marker["error"] == "ValueError: bad log"
+    assert marker["attributes"] == {"blockNumber": 7}
+
+
+def test_start_span_does_not_become_current(tracing_on):
+    with tracing.trace_request("job") as root:
+        detached = tracing.start_span("stream", function="GetAllAssets")
+        with tracing.span("sibling"):
+            pass
+        tracing.finish_span(detached, items=3)
+    assert [child.name for child in root.children] == ["stream", "sibling"]
+    assert detached.attributes == {"function": "GetAllAssets", "items": 3}
+    assert detached.end is not None
+
+
+def test_sampling_profiler_collects_stacks():
+    profiler = SamplingProfiler()
+    profiler.start(0.2, interval_ms=2)
+    with pytest.raises(RuntimeError):
+        profiler.start(1)
+
+    deadline = time.time() + 0.1
+    while time.time() < deadline:
+        sum(range(1000))
+    profiler.stop()
+
+    status = profiler.status()
+    assert status["running"] is False
+    assert status["samples"] > 0
+    assert any("test_sampling_profiler_collects_stacks" in entry["stack"] for entry in status["stacks"])